@@ -0,0 +1,62 @@
+"""gunicorn settings for multi-worker serving: gunicorn -c gunicorn.conf.py src.main:app (see startup.sh).
+
+With preload (the default), the master imports the app once, including the embedding model, and forked workers
+share those pages copy-on-write, so memory per extra worker stays small. gc.freeze keeps the garbage collector in
+each worker from writing to (and so copying) the shared objects.
+
+Reloading: kill -HUP <master> restarts the workers gracefully (in flight requests get graceful_timeout to finish),
+but with preload they fork from the already loaded master, so it doesn't pick up code changes. To deploy new code
+without downtime, start a new master with kill -USR2 <master>, then stop the old one with kill -QUIT <old master>.
+
+Shared state across workers needs a shared backend: set RATE_LIMIT_STORAGE_URI (src/startup/throttle.py) and
+DB_CONNECTION_BUDGET (src/startup/database.py).
+"""
+import os
+import gc
+import sys
+from dotenv import load_dotenv
+
+# Loaded here too, so .env settings apply before the app is imported
+load_dotenv()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Restart workers after this many requests (with jitter so they don't all restart together). 0 disables
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+# Streams can run long, so give in flight requests time to finish on reload or shutdown
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Worker heartbeat files in memory rather than on a possibly slow disk
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Model threads per worker, so workers x threads doesn't oversubscribe the cores
+threads_per_worker = int(os.getenv('WORKER_MODEL_THREADS', max(1, (os.cpu_count() or 1) // workers)))
+
+if preload_app:
+    # Load the embedding model in the master, and keep the gc from touching objects that forked workers will share
+    os.environ.setdefault('EMBEDDING_PRELOAD', 'true')
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Move everything loaded so far to a permanent generation the gc never scans, so workers don't copy those pages
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
+    # Read by src.startup.database.worker_pool_maxsize to split DB_CONNECTION_BUDGET
+    os.environ['WEB_CONCURRENCY'] = str(server.num_workers)
+    os.environ.setdefault('OMP_NUM_THREADS', str(threads_per_worker))
+    # Only imported already when preloaded, otherwise the worker imports (and opens) everything itself
+    embeddings = sys.modules.get('src.llm.embeddings')
+    if embeddings is not None:
+        embeddings.after_worker_fork(threads=threads_per_worker)
+    server.log.info('Worker %s started (preload=%s, model threads=%s)', worker.pid, preload_app, threads_per_worker)
@@ -0,0 +1,37 @@
+"""Recall/latency benchmark for the IVF backend against exact search.
+
+Uses synthetic clustered unit vectors shaped like e5-small-v2 embeddings, so no model download is needed.
+Run from the anthropic-fastapi directory:
+
+    python -m scripts.benchmark_ann --passages 1000000 --queries 200
+"""
+import argparse
+import numpy as np
+from src.llm.ann import IVFBackend, benchmark_recall
+
+
+def synthetic_embeddings(count: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--passages', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--n-lists', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = synthetic_embeddings(args.passages, args.dim, clusters=1000, rng=rng)
+    queries = synthetic_embeddings(args.queries, args.dim, clusters=1000, rng=rng)
+
+    backend = IVFBackend(n_lists=args.n_lists)
+    backend.build(matrix)
+    print(f'{args.passages} passages, {len(backend.centroids)} lists, top_k={args.top_k}')
+    print(f"{'backend':<8}{'n_probe':>8}{'recall':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for row in benchmark_recall(matrix, queries, backend, top_k=args.top_k):
+        print(f"{row['backend']:<8}{str(row['n_probe'] or '-'):>8}{row['recall']:>8.3f}{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}{row['p99_ms']:>10.2f}")
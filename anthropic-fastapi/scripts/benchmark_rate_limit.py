@@ -0,0 +1,82 @@
+"""Rate limit correctness across worker processes: several processes hit the same limit for the same client as fast as
+they can, the way N uvicorn/gunicorn workers would, and the total number of allowed hits is compared to the limit.
+
+With memory:// each process keeps its own counters, so about processes x limit hits get through. With a shared
+storage (sqlite:// from src/startup/rate_limit_storage.py, or redis://) the total stays at the limit.
+
+Run from the anthropic-fastapi directory:
+
+    python -m scripts.benchmark_rate_limit --processes 8 --limit 100/minute
+    python -m scripts.benchmark_rate_limit --storage redis://localhost:6379
+"""
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from src.startup import rate_limit_storage  # registers the sqlite:// storage scheme
+
+
+def hammer(storage_uri: str, strategy: str, limit: str, key: str, attempts: int, start_at: float, results):
+    try:
+        storage = storage_from_string(storage_uri)
+        limiter = STRATEGIES[strategy](storage)
+        item = parse(limit)
+        # Start every process together, so hits from all of them interleave
+        time.sleep(max(0.0, start_at - time.time()))
+        allowed = 0
+        start = time.perf_counter()
+        for _ in range(attempts):
+            if limiter.hit(item, key):
+                allowed += 1
+    except Exception as e:
+        # Report the failure instead of leaving the parent waiting on a result that never comes
+        results.put(e)
+        return
+    results.put((allowed, attempts, time.perf_counter() - start))
+
+
+def run(storage_uri: str, strategy: str, limit: str, processes: int, attempts: int) -> dict:
+    rate_limit_storage.check_strategy(storage_uri, strategy)
+    key = f'benchmark-{os.getpid()}-{time.time_ns()}'
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    workers = [
+        multiprocessing.Process(target=hammer, args=(storage_uri, strategy, limit, key, attempts, start_at, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            raise outcome
+    total_attempts = sum(outcome[1] for outcome in outcomes)
+    return {
+        'allowed': sum(outcome[0] for outcome in outcomes),
+        'hits_per_second': total_attempts / max(outcome[2] for outcome in outcomes),
+        'per_process': [outcome[0] for outcome in outcomes]
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=500, help='hits per process')
+    parser.add_argument('--limit', default='100/minute')
+    parser.add_argument('--strategy', default='sliding-window-counter', choices=sorted(STRATEGIES))
+    parser.add_argument('--storage', action='append', help='storage uri(s), defaults to memory:// and a temporary sqlite file')
+    args = parser.parse_args()
+
+    storages = args.storage or ['memory://', f'sqlite:///{os.path.join(tempfile.mkdtemp(), "rate_limits.db")}']
+    expected = parse(args.limit).amount
+    print(f'{args.processes} processes x {args.attempts} hits, limit {args.limit} ({args.strategy})')
+    print(f"{'storage':<48}{'allowed':>10}{'expected':>10}{'hits/s':>12}  per process")
+    for storage_uri in storages:
+        result = run(storage_uri, args.strategy, args.limit, args.processes, args.attempts)
+        print(f"{storage_uri:<48}{result['allowed']:>10}{expected:>10}{result['hits_per_second']:>12.0f}  {result['per_process']}")
@@ -0,0 +1,120 @@
+"""Throughput, latency and memory versus gunicorn worker count: starts the app with gunicorn.conf.py for each worker
+count, loads one endpoint, and reports requests/sec, p50/p99 latency, and the RSS and PSS of the master plus workers.
+
+RSS counts pages shared copy-on-write once per process, so it grows with every worker even when the memory is shared.
+PSS splits shared pages between the processes using them, so its total is the real footprint: with preload it should
+grow far less per worker than without.
+
+Linux only (reads /proc). Run from the anthropic-fastapi directory:
+
+    python -m scripts.benchmark_workers --workers 1 2 4 8 --path /ready
+    python -m scripts.benchmark_workers --workers 4 --no-preload
+"""
+import os
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+import httpx
+
+
+def process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    for child in open(f'/proc/{pid}/task/{pid}/children').read().split():
+        pids.extend(process_tree(int(child)))
+    return pids
+
+
+def memory_kb(pid: int) -> tuple[int, int]:
+    """RSS and PSS of one process, in kB.
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+async def wait_until_up(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.5)
+    raise TimeoutError(f'{url} not up after {timeout}s')
+
+
+async def load(url: str, concurrency: int, seconds: float) -> tuple[list[float], int]:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def user():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+        await asyncio.gather(*[user() for _ in range(concurrency)])
+    return latencies, errors
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run(workers: int, preload: bool, args) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD=str(preload).lower(), GUNICORN_BIND=f'127.0.0.1:{args.port}')
+    server = subprocess.Popen(['gunicorn', 'src.main:app', '-c', 'gunicorn.conf.py'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{args.port}{args.path}'
+    try:
+        asyncio.run(wait_until_up(url, args.startup_timeout))
+        # Let every worker finish starting before measuring
+        time.sleep(args.settle)
+        latencies, errors = asyncio.run(load(url, args.concurrency, args.seconds))
+        memory = [memory_kb(pid) for pid in process_tree(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies.sort()
+    return {
+        'workers': workers,
+        'requests_per_second': len(latencies) / args.seconds,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': errors,
+        'rss_mb': sum(rss for rss, _ in memory) / 1024,
+        'pss_mb': sum(pss for _, pss in memory) / 1024
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--no-preload', action='store_true')
+    parser.add_argument('--path', default='/')
+    parser.add_argument('--port', type=int, default=8200)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--settle', type=float, default=3)
+    parser.add_argument('--startup-timeout', type=float, default=180)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'RSS MB':>10}{'PSS MB':>10}")
+    for workers in args.workers:
+        result = run(workers, not args.no_preload, args)
+        print(f"{result['workers']:>8}{result['requests_per_second']:>10.0f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}{result['rss_mb']:>10.0f}{result['pss_mb']:>10.0f}")
@@ -0,0 +1,85 @@
+"""Load test for abrupt client disconnects on /stream: opens many concurrent streams, drops each connection after the
+first chunk, then watches the mock upstream until every upstream stream has been released.
+
+With cancellation propagating through the generator chain, open upstream streams fall to 0 within about a second
+and (almost) none run to completion; without it they stay open until each full reply has been generated.
+
+Run from the anthropic-fastapi directory, with the app pointed at the mock server:
+
+    MOCK_TOKEN_DELAY_MS=50 uvicorn scripts.mock_anthropic_server:app --port 8100
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8100 ANTHROPIC_API_KEY=mock uvicorn src.main:app --port 8000
+    python -m scripts.load_test_disconnects --streams 200
+"""
+import time
+import asyncio
+import argparse
+import httpx
+
+
+async def open_and_drop(client: httpx.AsyncClient, url: str, prompt: str, chunks: int) -> bool:
+    """Read the first chunks of a stream, then close the connection mid-stream.
+    """
+    async with client.stream('POST', url, json={'chat_input_list': [{'role': 'user', 'message': prompt}]}) as response:
+        received = 0
+        async for _ in response.aiter_raw():
+            received += 1
+            if received >= chunks:
+                break
+    return received > 0
+
+
+async def slow_reader(client: httpx.AsyncClient, url: str, prompt: str, read_delay: float) -> int:
+    """Read a full stream slowly, so the app has to hold back instead of buffering the whole reply.
+    """
+    received = 0
+    async with client.stream('POST', url, json={'chat_input_list': [{'role': 'user', 'message': prompt}]}) as response:
+        async for chunk in response.aiter_raw(64):
+            received += len(chunk)
+            await asyncio.sleep(read_delay)
+    return received
+
+
+async def main(args):
+    prompt = ' '.join(f'word{i}' for i in range(args.prompt_words))
+    limits = httpx.Limits(max_connections=args.streams, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=args.mock_url, timeout=30) as mock_client, \
+            httpx.AsyncClient(timeout=60, limits=limits) as app_client:
+        before = (await mock_client.get('/stats')).json()
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[open_and_drop(app_client, f'{args.app_url}/stream', prompt, args.chunks) for _ in range(args.streams)],
+            return_exceptions=True
+        )
+        dropped_at = time.perf_counter()
+        errors = [result for result in results if isinstance(result, Exception)]
+        print(f'{args.streams} streams opened and dropped after {args.chunks} chunk(s) in {dropped_at - start:.2f}s ({len(errors)} errors)')
+
+        # Watch upstream streams being released
+        while True:
+            stats = (await mock_client.get('/stats')).json()
+            elapsed = time.perf_counter() - dropped_at
+            print(f'  +{elapsed:5.2f}s open upstream streams: {stats["open_streams"]}')
+            if stats['open_streams'] == 0 or elapsed > args.watch_seconds:
+                break
+            await asyncio.sleep(0.25)
+        completed = stats['completed_streams'] - before['completed_streams']
+        print(f'upstream streams run to completion after disconnect: {completed} of {args.streams}')
+
+        if args.slow_readers:
+            received = await asyncio.gather(*[
+                slow_reader(app_client, f'{args.app_url}/stream', prompt, args.read_delay) for _ in range(args.slow_readers)
+            ])
+            print(f'{args.slow_readers} slow readers each received {min(received)}-{max(received)} bytes')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--app-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--mock-url', default='http://127.0.0.1:8100')
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--chunks', type=int, default=1, help='Chunks read before disconnecting')
+    parser.add_argument('--prompt-words', type=int, default=300, help='Mock replies echo the prompt, so this sets reply length')
+    parser.add_argument('--watch-seconds', type=float, default=30)
+    parser.add_argument('--slow-readers', type=int, default=0, help='Also run this many slow, complete reads')
+    parser.add_argument('--read-delay', type=float, default=0.05, help='Seconds between 64 byte reads for slow readers')
+    asyncio.run(main(parser.parse_args()))
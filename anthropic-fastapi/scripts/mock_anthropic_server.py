@@ -0,0 +1,84 @@
+"""Local stand-in for the Anthropic Messages API, emitting the same streaming event sequence as the real API.
+
+Point the app at it with ANTHROPIC_BASE_URL, ex (from the anthropic-fastapi directory):
+
+    uvicorn scripts.mock_anthropic_server:app --port 8100
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8100 ANTHROPIC_API_KEY=mock uvicorn src.main:app
+
+Env vars:
+    MOCK_FIRST_TOKEN_MS: Delay before the first event (default 200).
+    MOCK_TOKEN_DELAY_MS: Delay between text deltas (default 20).
+"""
+import os
+import json
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MOCK_FIRST_TOKEN_MS = float(os.getenv('MOCK_FIRST_TOKEN_MS', 200))
+MOCK_TOKEN_DELAY_MS = float(os.getenv('MOCK_TOKEN_DELAY_MS', 20))
+
+app = FastAPI()
+app.state.requests = 0
+app.state.open_streams = 0
+app.state.completed_streams = 0
+
+
+def reply_text(body: dict) -> str:
+    last_message = body['messages'][-1]['content']
+    if isinstance(last_message, list):
+        last_message = ' '.join(block.get('text', '') for block in last_message)
+    return f'Mock reply to: {last_message}'
+
+
+def usage(body: dict, text: str) -> dict:
+    input_tokens = sum(len(json.dumps(message['content'])) for message in body['messages']) // 4
+    return {'input_tokens': input_tokens, 'output_tokens': len(text) // 4 + 1}
+
+
+def sse(event_type: str, data: dict) -> str:
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+async def stream_events(body: dict, text: str):
+    app.state.open_streams += 1
+    try:
+        await asyncio.sleep(MOCK_FIRST_TOKEN_MS / 1000)
+        message = {
+            'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': body['model'], 'content': [],
+            'stop_reason': None, 'stop_sequence': None, 'usage': {**usage(body, text), 'output_tokens': 1}
+        }
+        yield sse('message_start', {'type': 'message_start', 'message': message})
+        yield sse('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}})
+        yield sse('ping', {'type': 'ping'})
+        for i, word in enumerate(text.split(' ')):
+            await asyncio.sleep(MOCK_TOKEN_DELAY_MS / 1000)
+            delta_text = word if i == 0 else ' ' + word
+            yield sse('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': delta_text}})
+        yield sse('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        yield sse('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None}, 'usage': {'output_tokens': usage(body, text)['output_tokens']}})
+        yield sse('message_stop', {'type': 'message_stop'})
+        app.state.completed_streams += 1
+    finally:
+        app.state.open_streams -= 1
+
+
+@app.post('/v1/messages')
+async def create_message(request: Request):
+    app.state.requests += 1
+    body = await request.json()
+    text = reply_text(body)
+    if body.get('stream'):
+        return StreamingResponse(stream_events(body, text), media_type='text/event-stream')
+
+    await asyncio.sleep(MOCK_FIRST_TOKEN_MS / 1000)
+    return JSONResponse({
+        'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': body['model'],
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn', 'stop_sequence': None, 'usage': usage(body, text)
+    })
+
+
+@app.get('/stats')
+async def stats():
+    return {'requests': app.state.requests, 'open_streams': app.state.open_streams, 'completed_streams': app.state.completed_streams}
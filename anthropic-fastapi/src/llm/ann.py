@@ -0,0 +1,252 @@
+import time
+import numpy as np
+
+
+def top_k_dot(matrix: np.ndarray, query_embeddings: np.ndarray, top_k: int, scales: np.ndarray = None, chunk_size: int = 65536) -> tuple[np.ndarray, np.ndarray]:
+    """Exact top k by dot product (cosine for normalized vectors), scanning the matrix in chunks so float16/memmap
+    storage is never converted to float32 all at once.
+
+    Args:
+        matrix (np.ndarray): Stored embeddings, one row per passage.
+        query_embeddings (np.ndarray): Normalized query embeddings, one row per query.
+        top_k (int): Number of matches per query.
+        scales (optional, np.ndarray): Per row scales when matrix holds int8 codes (see embedding_cache.quantize_int8).
+        chunk_size (optional, int): Rows scored per chunk. Defaults to 65536.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (row indices, scores), each shaped (queries, k) and sorted best first.
+    """
+    top_k = min(top_k, len(matrix))
+    best_scores = np.full((len(query_embeddings), 0), -np.inf, dtype=np.float32)
+    best_indices = np.zeros((len(query_embeddings), 0), dtype=np.int64)
+    for chunk_start in range(0, len(matrix), chunk_size):
+        chunk = np.asarray(matrix[chunk_start:chunk_start + chunk_size], dtype=np.float32)
+        chunk_scores = query_embeddings @ chunk.T
+        if scales is not None:
+            chunk_scores *= scales[chunk_start:chunk_start + len(chunk)]
+        scores = np.concatenate([best_scores, chunk_scores], axis=1)
+        indices = np.concatenate([best_indices, np.broadcast_to(np.arange(chunk_start, chunk_start + len(chunk)), (len(query_embeddings), len(chunk)))], axis=1)
+        keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k] if scores.shape[1] > top_k else np.argsort(-scores, axis=1)
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_indices = np.take_along_axis(indices, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+class ExactBackend:
+    """Brute force search over every stored vector. Always 100% recall, cost grows linearly with the corpus.
+    """
+    ready = True
+
+    def build(self, matrix: np.ndarray):
+        pass
+
+    def assign(self, matrix: np.ndarray, rows: np.ndarray):
+        pass
+
+    def move(self, from_row: int, to_row: int):
+        pass
+
+    def search(self, matrix: np.ndarray, query_embeddings: np.ndarray, top_k: int, scales: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        return top_k_dot(matrix, query_embeddings, top_k, scales=scales)
+
+
+def assign_to_centroids(matrix: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Index of the most similar centroid for every row, computed in chunks to bound memory.
+    """
+    assignments = np.empty(len(matrix), dtype=np.int32)
+    for chunk_start in range(0, len(matrix), chunk_size):
+        chunk = np.asarray(matrix[chunk_start:chunk_start + chunk_size], dtype=np.float32)
+        assignments[chunk_start:chunk_start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(matrix: np.ndarray, n_lists: int, iterations: int = 10, sample_size: int = 100000, seed: int = 42) -> np.ndarray:
+    """Spherical k-means on a sample of the (normalized) vectors.
+
+    Args:
+        matrix (np.ndarray): Vectors to cluster.
+        n_lists (int): Number of centroids.
+        iterations (optional, int): Lloyd iterations. Defaults to 10.
+        sample_size (optional, int): Max rows used for training. Defaults to 100000.
+        seed (optional, int): Random seed. Defaults to 42.
+
+    Returns:
+        np.ndarray: Normalized float32 centroids shaped (min(n_lists, sampled rows), dim).
+    """
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(len(matrix), size=min(sample_size, len(matrix)), replace=False))
+    sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+    # Can't seed more centroids than there are sampled rows
+    n_lists = min(n_lists, len(sample))
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_to_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_lists)
+
+        # Re-seed empty lists from random sample rows so every list stays useful
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class IVFBackend:
+    """Inverted file index in pure NumPy: vectors are bucketed by nearest k-means centroid and a query only scores
+    the vectors in its n_probe closest buckets. n_probe is the recall/latency knob.
+
+    Built from the index contents on first search and kept in sync on add/remove; it is not persisted, so it is
+    retrained on the first search after a restart. Added rows are bucketed with the existing centroids, so once the
+    corpus grows past retrain_growth times the size it was trained on, the backend reports not ready and the next
+    search retrains it.
+    """
+
+    def __init__(self, n_lists: int = None, n_probe: int = 8, iterations: int = 10, sample_size: int = 100000, seed: int = 42, retrain_growth: float = 2.0):
+        """
+        Args:
+            n_lists (optional, int): Number of buckets. Defaults to about 4 * sqrt(N), with at least 39 vectors per bucket.
+            n_probe (optional, int): Buckets scanned per query. Higher is slower with better recall. Defaults to 8.
+            iterations (optional, int): k-means iterations. Defaults to 10.
+            sample_size (optional, int): Max vectors used for k-means. Defaults to 100000.
+            seed (optional, int): Random seed. Defaults to 42.
+            retrain_growth (optional, float): Retrain once the row count exceeds this multiple of the trained row count. Defaults to 2.0.
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+        self.retrain_growth = retrain_growth
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.count = 0
+        self.trained_count = 0
+        self._list_order = None
+        self._list_offsets = None
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None and self.count <= self.trained_count * self.retrain_growth
+
+    def build(self, matrix: np.ndarray):
+        """Train centroids on the matrix and bucket every row. Works on int8 codes too, since a positive per row
+        scale doesn't change which centroid is nearest.
+        """
+        n_lists = self.n_lists or max(1, min(int(4 * np.sqrt(len(matrix))), len(matrix) // 39))
+        self.centroids = train_centroids(matrix, n_lists, iterations=self.iterations, sample_size=self.sample_size, seed=self.seed)
+        self.assignments = assign_to_centroids(matrix, self.centroids)
+        self.count = len(matrix)
+        self.trained_count = len(matrix)
+        self._list_order = None
+
+    def assign(self, matrix: np.ndarray, rows: np.ndarray):
+        """Bucket new or overwritten rows without retraining.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        needed = int(rows.max()) + 1 if len(rows) else 0
+        if needed > len(self.assignments):
+            self.assignments = np.resize(self.assignments, max(needed, len(self.assignments) * 2))
+        self.assignments[rows] = assign_to_centroids(matrix[rows], self.centroids)
+        self.count = max(self.count, needed)
+        self._list_order = None
+
+    def move(self, from_row: int, to_row: int):
+        """Mirror PassageIndex.remove: the last row (from_row) moves into to_row and the row count drops by one.
+        """
+        self.assignments[to_row] = self.assignments[from_row]
+        self.count -= 1
+        self._list_order = None
+
+    def _lists(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._list_order is None:
+            assignments = self.assignments[:self.count]
+            self._list_order = np.argsort(assignments, kind='stable')
+            self._list_offsets = np.searchsorted(assignments[self._list_order], np.arange(len(self.centroids) + 1))
+        return self._list_order, self._list_offsets
+
+    def search(self, matrix: np.ndarray, query_embeddings: np.ndarray, top_k: int, n_probe: int = None, scales: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Approximate top k for a batch of queries.
+
+        Args:
+            matrix (np.ndarray): Stored embeddings the backend was built on.
+            query_embeddings (np.ndarray): Normalized query embeddings, one row per query.
+            top_k (int): Number of matches per query.
+            n_probe (optional, int): Override the backend's n_probe for this call.
+            scales (optional, np.ndarray): Per row scales when matrix holds int8 codes.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (row indices, scores) shaped (queries, top_k), best first. Padded with
+            -1 / -inf when the probed buckets hold fewer than top_k vectors.
+        """
+        list_order, list_offsets = self._lists()
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        centroid_scores = query_embeddings @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+
+        indices = np.full((len(query_embeddings), top_k), -1, dtype=np.int64)
+        scores = np.full((len(query_embeddings), top_k), -np.inf, dtype=np.float32)
+        for i, (query_embedding, probe) in enumerate(zip(query_embeddings, probes)):
+            # Sorted so memmap reads go through the file in order
+            candidates = np.sort(np.concatenate([list_order[list_offsets[list_id]:list_offsets[list_id + 1]] for list_id in probe]))
+            if not len(candidates):
+                continue
+            candidate_scores = np.asarray(matrix[candidates], dtype=np.float32) @ query_embedding
+            if scales is not None:
+                candidate_scores *= scales[candidates]
+            k = min(top_k, len(candidates))
+            best = np.argpartition(-candidate_scores, k - 1)[:k] if len(candidates) > k else np.arange(len(candidates))
+            best = best[np.argsort(-candidate_scores[best])]
+            indices[i, :k] = candidates[best]
+            scores[i, :k] = candidate_scores[best]
+        return indices, scores
+
+
+def recall_at_k(exact_indices: np.ndarray, approx_indices: np.ndarray) -> float:
+    """Mean fraction of the exact top k that the approximate search also returned.
+    """
+    hits = [len(set(exact_row) & set(approx_row)) / len(exact_row) for exact_row, approx_row in zip(exact_indices, approx_indices)]
+    return float(np.mean(hits))
+
+
+def benchmark_recall(matrix: np.ndarray, query_embeddings: np.ndarray, backend: IVFBackend, top_k: int = 10, n_probes: tuple = (1, 2, 4, 8, 16, 32)) -> list[dict]:
+    """Compare an IVF backend against exact search across n_probe settings.
+
+    Args:
+        matrix (np.ndarray): Normalized corpus embeddings.
+        query_embeddings (np.ndarray): Normalized query embeddings.
+        backend (IVFBackend): Backend to evaluate, built on matrix if it isn't already.
+        top_k (optional, int): Matches per query. Defaults to 10.
+        n_probes (optional, tuple): n_probe values to sweep. Defaults to (1, 2, 4, 8, 16, 32).
+
+    Returns:
+        list[dict]: One row per setting with recall and per query latency (mean/p50/p99 in ms), exact search first.
+    """
+    if not backend.ready:
+        backend.build(matrix)
+
+    def time_queries(search) -> tuple[np.ndarray, np.ndarray]:
+        timings = []
+        results = []
+        for query_embedding in query_embeddings:
+            start = time.perf_counter()
+            results.append(search(query_embedding[None, :])[0][0])
+            timings.append((time.perf_counter() - start) * 1000)
+        return np.array(results), np.array(timings)
+
+    exact_indices, exact_timings = time_queries(lambda q: ExactBackend().search(matrix, q, top_k))
+    rows = [{'backend': 'exact', 'n_probe': None, 'recall': 1.0, 'mean_ms': exact_timings.mean(), 'p50_ms': np.percentile(exact_timings, 50), 'p99_ms': np.percentile(exact_timings, 99)}]
+    for n_probe in n_probes:
+        approx_indices, timings = time_queries(lambda q: backend.search(matrix, q, top_k, n_probe=n_probe))
+        rows.append({
+            'backend': 'ivf',
+            'n_probe': n_probe,
+            'recall': recall_at_k(exact_indices, approx_indices),
+            'mean_ms': timings.mean(),
+            'p50_ms': np.percentile(timings, 50),
+            'p99_ms': np.percentile(timings, 99)
+        })
+    return rows
@@ -0,0 +1,85 @@
+# Same module as pydantic-ai-streaming/src/anthropic_client.py: the two projects are deployed on their own and don't
+# share a package, so a change to one copy belongs in the other too.
+import os
+import weakref
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+ANTHROPIC_MAX_CONNECTIONS = int(os.getenv('ANTHROPIC_MAX_CONNECTIONS', 100))
+ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS', 20))
+ANTHROPIC_KEEPALIVE_EXPIRY = float(os.getenv('ANTHROPIC_KEEPALIVE_EXPIRY', 60))
+ANTHROPIC_DEFAULT_MODEL_CONCURRENCY = int(os.getenv('ANTHROPIC_DEFAULT_MODEL_CONCURRENCY', 50))
+# SDK level retries, set to 0 when a BatchRunner should own retry/backoff
+ANTHROPIC_MAX_RETRIES = int(os.getenv('ANTHROPIC_MAX_RETRIES', 2))
+
+# Per model concurrency limits, ex: ANTHROPIC_MODEL_CONCURRENCY=claude-3-haiku-20240307=100,claude-3-5-sonnet-20241022=20
+MODEL_CONCURRENCY_LIMITS = {
+    model.strip(): int(limit)
+    for model, limit in (item.split('=') for item in os.getenv('ANTHROPIC_MODEL_CONCURRENCY', '').split(',') if '=' in item)
+}
+
+# Keyed by event loop: a client's connection pool and the semaphores only work on the loop that created them, and
+# an entry goes away with its loop
+clients = weakref.WeakKeyDictionary()  # loop: AsyncAnthropic
+model_semaphores = weakref.WeakKeyDictionary()  # loop: {model: asyncio.Semaphore}
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2]).
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_client() -> AsyncAnthropic:
+    """Application scoped AsyncAnthropic client, so requests reuse pooled keep-alive connections instead of paying a
+    TLS handshake per call. One client per event loop (ex: separate asyncio.run calls), so a client still in use on
+    another loop is never replaced; call close_client before a loop ends.
+
+    Reads ANTHROPIC_API_KEY and ANTHROPIC_BASE_URL (ex: a local mock server) on creation.
+    """
+    loop = asyncio.get_running_loop()
+    client = clients.get(loop)
+    if client is None:
+        # The SDK's httpx client keeps its defaults (ex: redirects), with our pool limits on top
+        http_client = DefaultAsyncHttpxClient(
+            http2=http2_available(),
+            limits=httpx.Limits(
+                max_connections=ANTHROPIC_MAX_CONNECTIONS,
+                max_keepalive_connections=ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=ANTHROPIC_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(600, connect=10)
+        )
+        client = clients[loop] = AsyncAnthropic(
+            api_key=os.getenv('ANTHROPIC_API_KEY'),
+            base_url=os.getenv('ANTHROPIC_BASE_URL') or None,
+            max_retries=ANTHROPIC_MAX_RETRIES,
+            http_client=http_client
+        )
+    return client
+
+
+async def close_client():
+    """Close this event loop's client and its connection pool on shutdown.
+    """
+    client = clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+@asynccontextmanager
+async def model_slot(model: str):
+    """Hold one of the model's concurrency slots for the duration of a call (or a whole stream).
+    """
+    semaphores = model_semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(model)
+    if semaphore is None:
+        semaphore = semaphores[model] = asyncio.Semaphore(MODEL_CONCURRENCY_LIMITS.get(model, ANTHROPIC_DEFAULT_MODEL_CONCURRENCY))
+    async with semaphore:
+        yield
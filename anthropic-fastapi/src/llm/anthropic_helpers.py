@@ -1,44 +1,89 @@
 import os
 import json
 from typing import AsyncGenerator
-from anthropic import AsyncAnthropic
-
-ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
-
-
-async def anthropic_stream_api_call(chat_input_list: list) -> AsyncGenerator[str, None]:
-    system_prompt_text = 'You are an AI agent.'
-
-    # Build message list
-    message_input = []
-    for chat_instance in chat_input_list:
-        print(chat_instance)
-        
-        message_input.append({
-            'role': chat_instance['role'], 
-            "content": [
-                {
-                    "type": "text",
-                    "text": chat_instance['message']
-                }
-            ]
-        })
-
-    # Setup and make api call.
-    client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-    stream = await client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=2000,
-        system=system_prompt_text,
-        messages=message_input,
-        stream=True
-    )
-
-    async for event in stream:
-        if event.type in ['message_start', 'message_delta', 'message_stop', 'content_block_start', 'content_block_stop']:
-            pass
-        elif event.type == 'content_block_delta':
-            yield event.delta.text
-        else:
-            yield event.type
+from src.llm.anthropic_client import get_client, model_slot
+from src.llm.conversations import ConversationStore, build_message_input, with_cache_breakpoints, split_for_compaction, transcript
 
+MODEL = "claude-3-haiku-20240307"
+SYSTEM_PROMPT_TEXT = 'You are an AI agent.'
+
+# Compaction of conversations past the token budget: off, truncate (drop oldest turns) or summarize
+CONVERSATION_COMPACTION = os.getenv('CONVERSATION_COMPACTION', 'truncate').lower()
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', 16000))
+conversation_store = ConversationStore(
+    ttl=float(os.getenv('CONVERSATION_TTL', 24 * 3600)),
+    path=os.getenv('CONVERSATION_STORE_PATH')
+)
+
+
+async def summarize_messages(summary: str | None, messages: list) -> str:
+    """Fold old turns into the running conversation summary.
+    """
+    prompt = f'Existing summary:\n{summary}\n\n' if summary else ''
+    prompt += f'Conversation:\n{transcript(messages)}'
+    async with model_slot(MODEL):
+        message = await get_client().messages.create(
+            model=MODEL,
+            max_tokens=1000,
+            system='Summarize the conversation below for an assistant that will continue it. Keep facts, decisions, names and open questions. Reply with the summary only.',
+            messages=[{'role': 'user', 'content': [{'type': 'text', 'text': prompt}]}]
+        )
+    return message.content[0].text
+
+
+async def compact_conversation(conversation: dict) -> dict:
+    """Truncate or summarize the oldest turns once the conversation is past CONVERSATION_TOKEN_BUDGET.
+    """
+    if CONVERSATION_COMPACTION not in ('truncate', 'summarize'):
+        return conversation
+    old_messages, kept_messages = split_for_compaction(conversation['messages'], CONVERSATION_TOKEN_BUDGET)
+    if not old_messages:
+        return conversation
+    summary = conversation['summary']
+    if CONVERSATION_COMPACTION == 'summarize':
+        summary = await summarize_messages(summary, old_messages)
+    return {'messages': kept_messages, 'summary': summary}
+
+
+async def anthropic_stream_api_call(chat_input_list: list, conversation_id: str = None) -> AsyncGenerator[str, None]:
+    """Stream a reply. With a conversation_id, chat_input_list only holds the new turn(s): earlier turns come from
+    the conversation store, and the reply is stored once the stream completes.
+    """
+    new_messages = build_message_input(chat_input_list)
+    if conversation_id:
+        conversation = conversation_store.get(conversation_id)
+        conversation = await compact_conversation({**conversation, 'messages': conversation['messages'] + new_messages})
+    else:
+        conversation = {'messages': new_messages, 'summary': None}
+
+    # Cache breakpoints on the stable prefix, so the next turn reuses it from the prompt cache
+    system, message_input = with_cache_breakpoints(SYSTEM_PROMPT_TEXT, conversation['summary'], conversation['messages'])
+
+    # Make api call on the shared client, holding a model concurrency slot for the whole stream.
+    client = get_client()
+    reply_parts = []
+    async with model_slot(MODEL):
+        stream = await client.messages.create(
+            model=MODEL,
+            max_tokens=2000,
+            system=system,
+            messages=message_input,
+            stream=True
+        )
+
+        # Closing the stream on exit (including GeneratorExit/cancellation after a client disconnect) closes the
+        # upstream HTTP response right away, instead of leaving it open until garbage collection
+        async with stream:
+            async for event in stream:
+                if event.type in ['message_start', 'message_delta', 'message_stop', 'content_block_start', 'content_block_stop']:
+                    pass
+                elif event.type == 'content_block_delta':
+                    reply_parts.append(event.delta.text)
+                    yield event.delta.text
+                else:
+                    yield event.type
+
+    # Only completed exchanges are stored, so an interrupted stream leaves the history as it was
+    if conversation_id:
+        conversation['messages'].append({'role': 'assistant', 'content': [{'type': 'text', 'text': ''.join(reply_parts)}]})
+        conversation_store.save(conversation_id, conversation)
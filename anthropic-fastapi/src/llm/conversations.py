@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+CACHE_CONTROL = {'type': 'ephemeral'}
+
+
+def estimate_tokens(value) -> int:
+    """Rough token count (~4 characters per token) of a string or a list of message dicts.
+    """
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return len(text) // 4 + 1
+
+
+def build_message_input(chat_input_list: list) -> list:
+    """Convert ChatInput messages ({'role', 'message'}) to anthropic messages.
+    """
+    return [
+        {'role': chat_instance['role'], 'content': [{'type': 'text', 'text': chat_instance['message']}]}
+        for chat_instance in chat_input_list
+    ]
+
+
+def with_cache_breakpoints(system_prompt_text: str, summary: str | None, messages: list) -> tuple[list, list]:
+    """Build system blocks and messages with prompt cache breakpoints on the stable prefix: the system prompt (plus
+    any compaction summary) and the last message, so the next turn of the same conversation reads everything before
+    its new messages from the prompt cache. Prefixes shorter than the model's minimum cacheable length are simply
+    not cached.
+
+    Args:
+        system_prompt_text (str): Base system prompt.
+        summary (str | None): Summary of compacted turns, if any.
+        messages (list): Anthropic messages, the last one being the newest user turn.
+
+    Returns:
+        tuple[list, list]: (system blocks, messages), copied so stored history isn't modified.
+    """
+    system = [{'type': 'text', 'text': system_prompt_text}]
+    if summary:
+        system.append({'type': 'text', 'text': f'Summary of the earlier conversation:\n{summary}'})
+    system[-1] = {**system[-1], 'cache_control': CACHE_CONTROL}
+
+    messages = [{**message, 'content': list(message['content'])} for message in messages]
+    if messages:
+        last_content = messages[-1]['content']
+        last_content[-1] = {**last_content[-1], 'cache_control': CACHE_CONTROL}
+    return system, messages
+
+
+class ConversationStore:
+    """Server side conversation history keyed by conversation ID, so clients only send new turns.
+
+    Kept in an in-memory LRU, or in a sqlite file when path is set (shared by every worker process on the host).
+    """
+
+    def __init__(self, max_conversations: int = 10000, ttl: float = 24 * 3600, path: str = None):
+        """
+        Args:
+            max_conversations (optional, int): In-memory LRU size. Defaults to 10000.
+            ttl (optional, float): Seconds of inactivity before a conversation is dropped. Defaults to 1 day.
+            path (optional, str): sqlite file to store conversations in instead of memory. Defaults to None.
+        """
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._memory = OrderedDict()  # conversation_id: (conversation, updated_at)
+        self._lock = threading.Lock()
+
+        self.path = path
+        self._disk = None
+        self._disk_pid = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    @property
+    def disk(self) -> sqlite3.Connection:
+        # Opened lazily per process: a connection opened in a preloaded gunicorn master must not be used after the fork
+        if self._disk is None or self._disk_pid != os.getpid():
+            self._disk = sqlite3.connect(self.path, check_same_thread=False)
+            self._disk.execute('PRAGMA journal_mode=WAL')
+            self._disk.execute('CREATE TABLE IF NOT EXISTS conversations (conversation_id TEXT PRIMARY KEY, data TEXT, updated_at REAL)')
+            self._disk.commit()
+            self._disk_pid = os.getpid()
+        return self._disk
+
+    def get(self, conversation_id: str) -> dict:
+        """Return {'messages': [...], 'summary': str | None} for the conversation, empty if unknown or expired.
+        """
+        now = time.time()
+        with self._lock:
+            if self.path:
+                row = self.disk.execute(
+                    'SELECT data FROM conversations WHERE conversation_id = ? AND updated_at > ?', (conversation_id, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+            else:
+                entry = self._memory.get(conversation_id)
+                if entry is not None and entry[1] > now - self.ttl:
+                    self._memory.move_to_end(conversation_id)
+                    return entry[0]
+        return {'messages': [], 'summary': None}
+
+    def save(self, conversation_id: str, conversation: dict):
+        """Store the conversation, evicting the least recently used (memory) or expired (sqlite) ones.
+        """
+        now = time.time()
+        with self._lock:
+            if self.path:
+                self.disk.execute(
+                    'INSERT OR REPLACE INTO conversations (conversation_id, data, updated_at) VALUES (?, ?, ?)',
+                    (conversation_id, json.dumps(conversation), now)
+                )
+                self.disk.execute('DELETE FROM conversations WHERE updated_at <= ?', (now - self.ttl,))
+                self.disk.commit()
+            else:
+                self._memory[conversation_id] = (conversation, now)
+                self._memory.move_to_end(conversation_id)
+                while len(self._memory) > self.max_conversations:
+                    self._memory.popitem(last=False)
+
+
+def split_for_compaction(messages: list, token_budget: int, target_ratio: float = 0.5) -> tuple[list, list]:
+    """Split messages into (old, kept) once they exceed token_budget, keeping the most recent turns within
+    token_budget * target_ratio. Compacting well below the budget means the cached prefix only changes once in a
+    while, instead of on every turn.
+
+    The kept part always starts with a user message, as the API requires.
+
+    Returns:
+        tuple[list, list]: (messages to compact, messages to keep). old is empty when under budget.
+    """
+    if estimate_tokens(messages) <= token_budget:
+        return [], messages
+
+    target = token_budget * target_ratio
+    kept_tokens = 0
+    split = len(messages)
+    while split > 0 and kept_tokens + estimate_tokens(messages[split - 1:split]) <= target:
+        kept_tokens += estimate_tokens(messages[split - 1:split])
+        split -= 1
+    # Always keep the newest turn, even if it alone is over target
+    split = min(split, len(messages) - 1)
+    while split < len(messages) - 1 and messages[split]['role'] != 'user':
+        split += 1
+    return messages[:split], messages[split:]
+
+
+def transcript(messages: list) -> str:
+    """Plain text transcript of anthropic messages, for the summarization prompt.
+    """
+    return '\n\n'.join(
+        f"{message['role']}: {' '.join(block.get('text', '') for block in message['content'])}" for message in messages
+    )
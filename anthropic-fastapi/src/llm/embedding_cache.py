@@ -0,0 +1,197 @@
+import os
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+
+def quantize_int8(embeddings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per vector int8 quantization (4x smaller than float32).
+
+    Args:
+        embeddings (np.ndarray): Float embeddings, one row per vector.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (int8 codes, float32 scale per row), where codes * scale ~= embeddings.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scales = np.maximum(np.abs(embeddings).max(axis=1), 1e-12) / 127
+    codes = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Inverse of quantize_int8.
+    """
+    return codes.astype(np.float32) * scales[:, None]
+
+
+class EmbeddingCache:
+    """Embedding cache keyed by a content hash of the exact model input text, with an in-memory LRU tier and an
+    optional sqlite on-disk tier that survives restarts. Vectors can be stored as float32, float16 or int8.
+
+    Safe to call from worker threads.
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 50000, path: str = None, dtype: str = 'float32'):
+        """
+        Args:
+            model_name (str): Part of every key, so switching models never returns stale vectors.
+            max_entries (optional, int): In-memory LRU size. Defaults to 50000.
+            path (optional, str): sqlite file for the on-disk tier. Defaults to None (memory only).
+            dtype (optional, str): Storage dtype: float32, float16 or int8. Defaults to float32.
+        """
+        if dtype not in ('float32', 'float16', 'int8'):
+            raise ValueError(f'Unsupported embedding cache dtype {dtype}')
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self._memory = OrderedDict()  # key: (vector, scale)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.path = path
+        self._disk = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.reopen()
+
+    def reopen(self):
+        """Open a new connection to the on-disk tier. Call in a forked worker (ex: gunicorn --preload), since a sqlite
+        connection must not be used from a process other than the one that opened it.
+        """
+        if not self.path:
+            return
+        self._disk = sqlite3.connect(self.path, check_same_thread=False)
+        self._disk.execute('CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, dtype TEXT, scale REAL, vector BLOB)')
+        self._disk.commit()
+
+    def make_key(self, text: str) -> bytes:
+        return hashlib.sha256(f'{self.model_name}\0{text}'.encode()).digest()
+
+    def _pack(self, embeddings: np.ndarray) -> list[tuple[np.ndarray, float]]:
+        if self.dtype == 'int8':
+            codes, scales = quantize_int8(embeddings)
+            return list(zip(codes, scales.tolist()))
+        return [(embedding, 1.0) for embedding in np.asarray(embeddings, dtype=self.dtype)]
+
+    @staticmethod
+    def _unpack(vector: np.ndarray, scale: float) -> np.ndarray:
+        return vector.astype(np.float32) * scale if vector.dtype == np.int8 else vector.astype(np.float32)
+
+    def _remember(self, key: bytes, packed: tuple[np.ndarray, float]):
+        self._memory[key] = packed
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> tuple[dict, list[int]]:
+        """Look texts up in memory, then on disk.
+
+        Returns:
+            tuple[dict, list[int]]: ({position: float32 vector} for hits, positions of misses).
+        """
+        keys = [self.make_key(text) for text in texts]
+        found = {}
+        missing = []
+        with self._lock:
+            for position, key in enumerate(keys):
+                packed = self._memory.get(key)
+                if packed is not None:
+                    self._memory.move_to_end(key)
+                    found[position] = self._unpack(*packed)
+                    self.hits += 1
+                else:
+                    missing.append(position)
+
+            if missing and self._disk is not None:
+                missing_keys = [keys[position] for position in missing]
+                rows = {}
+                for chunk_start in range(0, len(missing_keys), 500):
+                    chunk = missing_keys[chunk_start:chunk_start + 500]
+                    rows.update({
+                        key: (np.frombuffer(vector, dtype=dtype), scale)
+                        for key, dtype, scale, vector in self._disk.execute(
+                            f"SELECT key, dtype, scale, vector FROM embeddings WHERE key IN ({', '.join(['?'] * len(chunk))})",
+                            chunk
+                        )
+                    })
+                still_missing = []
+                for position in missing:
+                    packed = rows.get(keys[position])
+                    if packed is None:
+                        still_missing.append(position)
+                    else:
+                        self._remember(keys[position], packed)
+                        found[position] = self._unpack(*packed)
+                        self.disk_hits += 1
+                missing = still_missing
+            self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, texts: list[str], embeddings: np.ndarray):
+        """Store freshly computed embeddings in both tiers.
+        """
+        packed_rows = self._pack(embeddings)
+        keys = [self.make_key(text) for text in texts]
+        with self._lock:
+            for key, packed in zip(keys, packed_rows):
+                self._remember(key, packed)
+            if self._disk is not None:
+                self._disk.executemany(
+                    'INSERT OR REPLACE INTO embeddings (key, dtype, scale, vector) VALUES (?, ?, ?, ?)',
+                    [(key, vector.dtype.name, scale, vector.tobytes()) for key, (vector, scale) in zip(keys, packed_rows)]
+                )
+                self._disk.commit()
+
+    def encode(self, texts: list[str], encode_fn) -> np.ndarray:
+        """Return float32 embeddings for texts, only calling encode_fn for cache misses.
+
+        Args:
+            texts (list[str]): Exact model input texts (including any query:/passage: prefix).
+            encode_fn: Function taking a list of texts and returning normalized embeddings.
+
+        Returns:
+            np.ndarray: float32 embeddings, one row per text.
+        """
+        found, missing = self.get_many(texts)
+        if missing:
+            # Dedupe within the call so repeated texts are only encoded once
+            unique_missing_texts = list(dict.fromkeys(texts[position] for position in missing))
+            self._fill_missing(texts, found, missing, unique_missing_texts, encode_fn(unique_missing_texts))
+        return self._stack(texts, found)
+
+    async def encode_async(self, texts: list[str], encode_fn) -> np.ndarray:
+        """Same as encode, for an async encode_fn (ex: EncodeBatcher.encode). With the on-disk tier, the sqlite lookups
+        and writes run in a worker thread so they don't block the event loop.
+        """
+        if self._disk is None:
+            found, missing = self.get_many(texts)
+        else:
+            found, missing = await asyncio.to_thread(self.get_many, texts)
+        if missing:
+            unique_missing_texts = list(dict.fromkeys(texts[position] for position in missing))
+            computed = await encode_fn(unique_missing_texts)
+            if self._disk is None:
+                self._fill_missing(texts, found, missing, unique_missing_texts, computed)
+            else:
+                await asyncio.to_thread(self._fill_missing, texts, found, missing, unique_missing_texts, computed)
+        return self._stack(texts, found)
+
+    def _fill_missing(self, texts: list[str], found: dict, missing: list[int], unique_missing_texts: list[str], computed: np.ndarray):
+        computed = np.asarray(computed, dtype=np.float32)
+        self.put_many(unique_missing_texts, computed)
+        computed_by_text = dict(zip(unique_missing_texts, computed))
+        for position in missing:
+            found[position] = computed_by_text[texts[position]]
+
+    @staticmethod
+    def _stack(texts: list[str], found: dict) -> np.ndarray:
+        return np.stack([found[position] for position in range(len(texts))]) if texts else np.zeros((0, 0), dtype=np.float32)
+
+    def stats(self) -> dict:
+        return {'entries': len(self._memory), 'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'dtype': self.dtype}
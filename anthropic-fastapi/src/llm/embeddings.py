@@ -1,12 +1,125 @@
-from sentence_transformers import SentenceTransformer
-from sentence_transformers.util import semantic_search
+import os
+import sys
+import logging
+import threading
+import numpy as np
+from src.llm.embedding_cache import EmbeddingCache
+from src.llm.encode_batcher import EncodeBatcher
 
+MODEL_NAME = "intfloat/e5-small-v2"
+EMBEDDING_WARM_UP = os.getenv('EMBEDDING_WARM_UP', 'true').lower() == 'true'
+EMBEDDING_PRELOAD = os.getenv('EMBEDDING_PRELOAD', 'false').lower() == 'true'
 
-model = SentenceTransformer(
-    "intfloat/e5-small-v2",
-    cache_folder='src/model_download_cache'
+logger = logging.getLogger(__name__)
+
+# Loaded on first use (or by a background warm-up) so importing the app doesn't pay for torch and the model
+model = None
+model_state = 'not_loaded'  # not_loaded, loading, ready, failed
+model_lock = threading.Lock()
+
+
+def get_model():
+    """Return the SentenceTransformer model, loading it on first use. Safe to call from several threads at once.
+    """
+    global model, model_state
+    if model is not None:
+        return model
+    with model_lock:
+        if model is None:
+            model_state = 'loading'
+            try:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(
+                    MODEL_NAME,
+                    cache_folder='src/model_download_cache'
+                )
+            except Exception:
+                model_state = 'failed'
+                raise
+            model_state = 'ready'
+            logger.info('Loaded embedding model %s', MODEL_NAME)
+    return model
+
+
+def start_model_warm_up() -> threading.Thread:
+    """Load the model in a background thread so startup doesn't block but the first request usually finds it ready.
+    """
+    thread = threading.Thread(target=get_model, name='embedding-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def model_ready() -> bool:
+    return model_state == 'ready'
+
+
+def encode_with_model(texts: list[str]) -> np.ndarray:
+    return get_model().encode(texts, normalize_embeddings=True)
+
+# Same queries and passages recur constantly, so skip the model for anything seen before
+embedding_cache = EmbeddingCache(
+    MODEL_NAME,
+    max_entries=int(os.getenv('EMBEDDING_CACHE_SIZE', 50000)),
+    path=os.getenv('EMBEDDING_CACHE_PATH'),
+    dtype=os.getenv('EMBEDDING_CACHE_DTYPE', 'float32')
+)
+
+# Async callers share batched model calls in a worker thread instead of blocking the event loop one request at a time
+encode_batcher = EncodeBatcher(
+    encode_with_model,
+    max_batch_size=int(os.getenv('ENCODE_MAX_BATCH_SIZE', 64)),
+    max_wait_ms=float(os.getenv('ENCODE_MAX_WAIT_MS', 5))
 )
-print(model)
+
+
+def encode_texts(input_texts: list[str]) -> np.ndarray:
+    """Encode already prefixed texts into normalized float32 embeddings, going through the embedding cache.
+    """
+    return embedding_cache.encode(input_texts, encode_with_model)
+
+
+def encode_queries(queries: list[str]) -> np.ndarray:
+    """Encode queries into normalized float32 embeddings (e5 expects the query: prefix).
+    """
+    return encode_texts(['query: ' + query for query in queries])
+
+
+def encode_passages(passages: list[str]) -> np.ndarray:
+    """Encode passages into normalized float32 embeddings (e5 expects the passage: prefix).
+    """
+    return encode_texts(['passage: ' + passage for passage in passages])
+
+
+async def encode_texts_async(input_texts: list[str]) -> np.ndarray:
+    """Async version of encode_texts, sending cache misses through the shared encode batcher.
+    """
+    return await embedding_cache.encode_async(input_texts, encode_batcher.encode)
+
+
+async def encode_queries_async(queries: list[str]) -> np.ndarray:
+    """Async version of encode_queries.
+    """
+    return await encode_texts_async(['query: ' + query for query in queries])
+
+
+async def encode_passages_async(passages: list[str]) -> np.ndarray:
+    """Async version of encode_passages.
+    """
+    return await encode_texts_async(['passage: ' + passage for passage in passages])
+
+
+def search_passages(query_embeddings: np.ndarray, passage_embeddings: np.ndarray, passages: list[str], top_k: int) -> list[str]:
+    """Unique passages that best match the queries, up to top_k matches per query, in query then score order.
+    """
+    from sentence_transformers.util import semantic_search
+    search_results = semantic_search(query_embeddings, passage_embeddings, top_k=top_k)
+    text_only_result_list = []
+    for result in search_results:
+        for result_match in result:
+            if passages[result_match['corpus_id']] not in text_only_result_list:
+                text_only_result_list.append(passages[result_match['corpus_id']])
+
+    return text_only_result_list
 
 
 def get_top_k_results(queries: list[str], passages: list[str], top_k: int = 3) -> list[str]:
@@ -20,16 +133,39 @@ def get_top_k_results(queries: list[str], passages: list[str], top_k: int = 3) -
         list[str]: List of unique passages that best match the query, up to top_k matches per query.
     """
     input_texts = ['query: ' + query for query in queries] + ['passage: ' + passage for passage in passages]
-    embeddings = model.encode(input_texts, normalize_embeddings=True)
-    query_embeddings = embeddings[:len(queries)]
-    passage_embeddings = embeddings[len(queries):]
+    embeddings = encode_texts(input_texts)
+    return search_passages(embeddings[:len(queries)], embeddings[len(queries):], passages, top_k)
 
-    search_results = semantic_search(query_embeddings, passage_embeddings, top_k=top_k)
-    text_only_result_list = []
-    for result in search_results:
-        for result_match in result:
-            if passages[result_match['corpus_id']] not in text_only_result_list:
-                text_only_result_list.append(passages[result_match['corpus_id']])
 
-    return text_only_result_list
-        
\ No newline at end of file
+async def get_top_k_results_async(queries: list[str], passages: list[str], top_k: int = 3) -> list[str]:
+    """Async version of get_top_k_results, for use from request handlers.
+
+    Args:
+        queries (list[str]): Questions or queries to use to lookup.
+        passages (list[str]): Possible results.
+
+    Returns:
+        list[str]: List of unique passages that best match the query, up to top_k matches per query.
+    """
+    input_texts = ['query: ' + query for query in queries] + ['passage: ' + passage for passage in passages]
+    embeddings = await encode_texts_async(input_texts)
+    return search_passages(embeddings[:len(queries)], embeddings[len(queries):], passages, top_k)
+
+
+def after_worker_fork(threads: int = None):
+    """Reset per process state in a worker forked from a preloaded master (gunicorn post_fork hook).
+
+    Args:
+        threads (optional, int): Model threads for this worker, ex: cores // workers so workers don't oversubscribe the cores. Defaults to None (torch default).
+    """
+    embedding_cache.reopen()
+    if threads:
+        # Applies to a torch imported later in this worker, and to one already loaded by the master
+        os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+        if 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(threads)
+
+
+# With gunicorn --preload, loading here happens once in the master and forked workers share the weights copy-on-write
+if EMBEDDING_PRELOAD:
+    get_model()
@@ -0,0 +1,100 @@
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EncodeBatcher:
+    """Collects encode requests from many coroutines into one model call, run in a worker thread so the event loop
+    (and any streaming responses on it) never blocks on the model.
+
+    A batch is sent once it holds max_batch_size texts or max_wait_ms has passed since its first text arrived. Texts
+    in a batch are sorted by length and split into sub-batches, so short texts aren't padded to the longest one.
+    """
+
+    def __init__(self, encode_fn, max_batch_size: int = 64, max_wait_ms: float = 5, sub_batch_size: int = 32):
+        """
+        Args:
+            encode_fn: Blocking function taking a list of texts and returning one embedding row per text.
+            max_batch_size (optional, int): Max texts collected per batch. Defaults to 64.
+            max_wait_ms (optional, float): Max time the first text in a batch waits for others. Defaults to 5.
+            sub_batch_size (optional, int): Texts per model call within a length sorted batch. Defaults to 32.
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.sub_batch_size = sub_batch_size
+        # One thread: the model already parallelizes internally, more would just oversubscribe the cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='encode')
+        self._queue = None
+        self._worker = None
+        self.batches = 0
+        self.texts = 0
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """Encode texts as part of the next batch.
+
+        Args:
+            texts (list[str]): Exact model input texts.
+
+        Returns:
+            np.ndarray: One embedding row per text.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            futures.append(future)
+            self._queue.put_nowait((text, future))
+        return np.stack(await asyncio.gather(*futures))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Skip texts whose caller was cancelled while waiting
+            batch = [(text, future) for text, future in batch if not future.done()]
+            batch.sort(key=lambda item: len(item[0]))
+            for sub_batch_start in range(0, len(batch), self.sub_batch_size):
+                sub_batch = batch[sub_batch_start:sub_batch_start + self.sub_batch_size]
+                try:
+                    embeddings = await loop.run_in_executor(self._executor, self.encode_fn, [text for text, _ in sub_batch])
+                except Exception as e:
+                    for _, future in sub_batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), embedding in zip(sub_batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+            self.batches += 1
+            self.texts += len(batch)
+
+    async def close(self):
+        """Stop the batching task and the worker thread.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,254 @@
+import os
+import json
+import asyncio
+import sqlite3
+import threading
+import numpy as np
+from src.llm.embeddings import encode_queries, encode_passages, encode_queries_async
+from src.llm.ann import ExactBackend
+from src.llm.embedding_cache import quantize_int8
+
+
+class PassageIndex:
+    """Persistent passage embedding index, so passages are encoded once on add instead of on every query.
+
+    Embeddings are stored normalized in a memory-mapped .npy file (float32, float16 or int8) next to a .sqlite file
+    holding the passage ids and text, one table row per matrix row, so add/remove only write the rows they change. int8 keeps a per row scale in a .scales.npy file and is searched directly,
+    without dequantizing the whole matrix. Row order is not stable: removing a passage moves the last row into its slot.
+
+    Safe to share between threads (search_async scores in a worker thread): building the backend, searching and
+    add/remove take one lock, so a search never sees a half built backend or rows being moved.
+    """
+
+    def __init__(self, path: str, dtype: str = 'float32', dim: int = 384, backend=None):
+        """
+        Args:
+            path (str): File path prefix, ex: src/index/knowledge_base creates knowledge_base.npy and knowledge_base.sqlite.
+            dtype (optional, str): Storage dtype, float32, float16 (half the memory, ~1e-3 score error) or int8 (quarter, ~1e-2). Defaults to float32.
+            dim (optional, int): Embedding size. Defaults to 384 (e5-small-v2).
+            backend (optional): Search backend from src.llm.ann, ex: IVFBackend(n_probe=8). Defaults to ExactBackend.
+        """
+        self.path = path
+        self.backend = backend or ExactBackend()
+        self.matrix_path = f'{path}.npy'
+        self.meta_path = f'{path}.sqlite'
+        self.legacy_meta_path = f'{path}.json'
+        self.scales_path = f'{path}.scales.npy'
+        self.ids = []
+        self.passages = []
+        self.id_to_row = {}
+        self.matrix = None
+        self.scales = None
+        self.lock = threading.Lock()
+        self._disk = None
+        self._disk_pid = None
+
+        if os.path.exists(self.meta_path):
+            meta = dict(self.disk.execute('SELECT key, value FROM meta'))
+            rows = self.disk.execute('SELECT id, passage FROM passages ORDER BY row').fetchall()
+            self._load(meta['dtype'], int(meta['dim']), [passage_id for passage_id, _ in rows], [passage for _, passage in rows])
+        elif os.path.exists(self.legacy_meta_path):
+            # Index saved before the sqlite sidecar: load the json once and move it over
+            with open(self.legacy_meta_path) as f:
+                meta = json.load(f)
+            self._load(meta['dtype'], meta['dim'], meta['ids'], meta['passages'])
+            self.save(rows=range(len(self.ids)))
+        else:
+            self.dtype = np.dtype(dtype)
+            self.dim = dim
+
+    def _load(self, dtype: str, dim: int, ids: list[str], passages: list[str]):
+        self.dtype = np.dtype(dtype)
+        self.dim = dim
+        self.ids = ids
+        self.passages = passages
+        self.id_to_row = {passage_id: row for row, passage_id in enumerate(self.ids)}
+        # No matrix yet if only remove ran on an empty index
+        if os.path.exists(self.matrix_path):
+            self.matrix = np.load(self.matrix_path, mmap_mode='r+')
+            if self.quantized:
+                self.scales = np.load(self.scales_path, mmap_mode='r+')
+
+    @property
+    def disk(self) -> sqlite3.Connection:
+        """sqlite connection for the id/passage table, reopened after a fork since a connection can't be shared across processes.
+        """
+        if self._disk is None or self._disk_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.meta_path) or '.', exist_ok=True)
+            self._disk = sqlite3.connect(self.meta_path, check_same_thread=False)
+            self._disk.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._disk.execute('CREATE TABLE IF NOT EXISTS passages (row INTEGER PRIMARY KEY, id TEXT, passage TEXT)')
+            self._disk.commit()
+            self._disk_pid = os.getpid()
+        return self._disk
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def quantized(self) -> bool:
+        return self.dtype == np.int8
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Stored embeddings for the live rows (a view into the memmap).
+        """
+        if self.matrix is None:
+            return np.zeros((0, self.dim), dtype=self.dtype)
+        return self.matrix[:len(self.ids)]
+
+    @property
+    def row_scales(self) -> np.ndarray:
+        """Per row int8 scales for the live rows, or None when not quantized.
+        """
+        if self.scales is None:
+            return None
+        return self.scales[:len(self.ids)]
+
+    def _ensure_capacity(self, rows_needed: int):
+        capacity = 0 if self.matrix is None else len(self.matrix)
+        if rows_needed <= capacity:
+            return
+
+        # Double capacity so repeated adds stay amortized O(1) per row
+        new_capacity = max(rows_needed, capacity * 2, 1024)
+        os.makedirs(os.path.dirname(self.matrix_path) or '.', exist_ok=True)
+        tmp_path = f'{self.matrix_path}.tmp'
+        new_matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=self.dtype, shape=(new_capacity, self.dim))
+        if self.matrix is not None:
+            new_matrix[:len(self.ids)] = self.matrix[:len(self.ids)]
+            del self.matrix
+        new_matrix.flush()
+        del new_matrix
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode='r+')
+
+        if self.quantized:
+            new_scales = np.lib.format.open_memmap(f'{self.scales_path}.tmp', mode='w+', dtype=np.float32, shape=(new_capacity,))
+            if self.scales is not None:
+                new_scales[:len(self.ids)] = self.scales[:len(self.ids)]
+                del self.scales
+            new_scales.flush()
+            del new_scales
+            os.replace(f'{self.scales_path}.tmp', self.scales_path)
+            self.scales = np.load(self.scales_path, mmap_mode='r+')
+
+    def add(self, ids: list[str], passages: list[str]):
+        """Encode and store passages. Existing ids are re-encoded and overwritten in place.
+
+        Args:
+            ids (list[str]): Unique passage ids.
+            passages (list[str]): Passage text, same order as ids.
+        """
+        if self.quantized:
+            embeddings, scales = quantize_int8(encode_passages(passages))
+        else:
+            embeddings, scales = encode_passages(passages).astype(self.dtype), None
+        with self.lock:
+            self._ensure_capacity(len(self.ids) + len(ids))
+            rows = []
+            for i, (passage_id, passage, embedding) in enumerate(zip(ids, passages, embeddings)):
+                row = self.id_to_row.get(passage_id)
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(passage_id)
+                    self.passages.append(passage)
+                    self.id_to_row[passage_id] = row
+                else:
+                    self.passages[row] = passage
+                self.matrix[row] = embedding
+                if scales is not None:
+                    self.scales[row] = scales[i]
+                rows.append(row)
+            if self.backend.ready:
+                self.backend.assign(self.embeddings, rows)
+            self.save(rows=rows)
+
+    def remove(self, ids: list[str]):
+        """Remove passages by id, ignoring unknown ids.
+        """
+        with self.lock:
+            moved_rows = set()
+            for passage_id in ids:
+                row = self.id_to_row.pop(passage_id, None)
+                if row is None:
+                    continue
+                last_row = len(self.ids) - 1
+                if row != last_row:
+                    moved_rows.add(row)
+                    self.matrix[row] = self.matrix[last_row]
+                    if self.scales is not None:
+                        self.scales[row] = self.scales[last_row]
+                    self.ids[row] = self.ids[last_row]
+                    self.passages[row] = self.passages[last_row]
+                    self.id_to_row[self.ids[row]] = row
+                if self.backend.ready:
+                    self.backend.move(last_row, row)
+                self.ids.pop()
+                self.passages.pop()
+            self.save(rows=[row for row in moved_rows if row < len(self.ids)])
+
+    def save(self, rows=()):
+        """Flush the memmap, then write the changed rows to the id/passage table and drop rows past the end, in one
+        transaction.
+
+        Args:
+            rows (optional, iterable[int]): Rows added or changed since the last save. Defaults to none.
+        """
+        if self.matrix is not None:
+            self.matrix.flush()
+        if self.scales is not None:
+            self.scales.flush()
+        with self.disk:
+            self.disk.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [('dtype', self.dtype.name), ('dim', str(self.dim))])
+            self.disk.executemany('INSERT OR REPLACE INTO passages (row, id, passage) VALUES (?, ?, ?)', [(row, self.ids[row], self.passages[row]) for row in rows])
+            self.disk.execute('DELETE FROM passages WHERE row >= ?', (len(self.ids),))
+
+    def search(self, queries: list[str], top_k: int = 3) -> list[list[dict]]:
+        """Encode only the queries and score them against the stored passage embeddings.
+
+        Args:
+            queries (list[str]): Questions or queries to use to lookup.
+            top_k (optional, int): Matches per query. Defaults to 3.
+
+        Returns:
+            list[list[dict]]: Per query, up to top_k {'id', 'passage', 'score'} dicts, best first.
+        """
+        if not self.ids:
+            return [[] for _ in queries]
+        return self.search_embeddings(encode_queries(queries), top_k=top_k)
+
+    async def search_async(self, queries: list[str], top_k: int = 3) -> list[list[dict]]:
+        """Async version of search: queries go through the encode batcher and scoring runs in a worker thread.
+        """
+        if not self.ids:
+            return [[] for _ in queries]
+        query_embeddings = await encode_queries_async(queries)
+        return await asyncio.to_thread(self.search_embeddings, query_embeddings, top_k)
+
+    def search_embeddings(self, query_embeddings: np.ndarray, top_k: int = 3) -> list[list[dict]]:
+        """Batch search with already encoded (normalized) query embeddings.
+        """
+        with self.lock:
+            if not self.ids:
+                return [[] for _ in query_embeddings]
+            if not self.backend.ready:
+                self.backend.build(self.embeddings)
+            indices, scores = self.backend.search(self.embeddings, query_embeddings, top_k, scales=self.row_scales)
+            return [
+                [{'id': self.ids[row], 'passage': self.passages[row], 'score': float(score)} for row, score in zip(row_indices, row_scores) if row >= 0]
+                for row_indices, row_scores in zip(indices, scores)
+            ]
+
+    def get_top_k_results(self, queries: list[str], top_k: int = 3) -> list[str]:
+        """Same output as embeddings.get_top_k_results, but searching the stored index.
+
+        Returns:
+            list[str]: List of unique passages that best match the query, up to top_k matches per query.
+        """
+        text_only_result_list = []
+        for result in self.search(queries, top_k=top_k):
+            for result_match in result:
+                if result_match['passage'] not in text_only_result_list:
+                    text_only_result_list.append(result_match['passage'])
+        return text_only_result_list
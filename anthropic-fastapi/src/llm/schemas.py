@@ -3,6 +3,8 @@ from pydantic import BaseModel
 
 class ChatInput(BaseModel):
     chat_input_list: list
+    # Server side session: when set, chat_input_list only holds the new turn(s)
+    conversation_id: str | None = None
 
     class Config:
         json_schema_extra = {
@@ -1,6 +1,8 @@
-from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from src.llm.embeddings import EMBEDDING_WARM_UP, start_model_warm_up
+from src.llm.anthropic_client import get_client, close_client
+from src.startup.referer import RefererMiddleware
 
 # Start up app
 app = FastAPI()
@@ -21,32 +23,35 @@ app.add_middleware(
 )
 
 
-@app.middleware('http')
-async def validate_referer(request: Request, call_next):
+# Referer check, as a pure ASGI middleware so streaming responses pass through untouched
+app.add_middleware(RefererMiddleware)
+
+
+@app.on_event("startup")
+async def warm_up_embedding_model():
+    if EMBEDDING_WARM_UP:
+        start_model_warm_up()
+
+
+@app.on_event("startup")
+async def open_anthropic_client():
+    get_client()
+
+
+@app.on_event("shutdown")
+async def close_anthropic_client():
+    await close_client()
 
-    # Check Referer
-    approved_referers = ['http://localhost:8000/', 'http://localhost:8080/', 'http://localhost:5173/'] # Could later add 'https://xxx.netlify.app/', 'https://xxx.azurewebsites.net/'
-    referer = request.headers.get('referer')
-    if referer:
-        if not any(referer.startswith(approved_referer) for approved_referer in approved_referers):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Not Authorized",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
-    
-    response = await call_next(request)
-    return response
 
 """ # Enable if db is needed
-from src.startup.database import create_pool, close_pool
+from src.startup.database import create_pools, close_pools
 
 @app.on_event("startup")
 async def startup():
-    await create_pool()
+    await create_pools()
 
 
 @app.on_event("shutdown")
 async def shutdown():
-    await close_pool()
+    await close_pools()
 """
\ No newline at end of file
@@ -1,67 +1,294 @@
 import os
+import re
+import json
+import logging
 import aioodbc
 import asyncio
-from functools import wraps
+import time
+from functools import wraps, lru_cache
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from src.startup.query_cache import QueryCache, cache_sql_query
+from src.startup.retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError, PoolExhaustedError, is_transient_error
+from src.startup.db_metrics import PoolMetrics
 
 DB_SERVER = os.getenv('DB_SERVER')
 DB_USER_NAME = os.getenv('DB_USER_NAME')
 DB_USER_PW = os.getenv('DB_USER_PW')
 DB_DATABASE = os.getenv('DB_DATABASE')
+DB_POOL_MINSIZE = int(os.getenv('DB_POOL_MINSIZE', 1))
+DB_POOL_MAXSIZE = int(os.getenv('DB_POOL_MAXSIZE', 10))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 25*60))
+DB_ACQUIRE_TIMEOUT = float(os.getenv('DB_ACQUIRE_TIMEOUT', 10))
+DB_PRE_PING = os.getenv('DB_PRE_PING', 'true').lower() == 'true'
+# Connections allowed per database server across every worker process. When set, each worker's pools get an equal
+# share (DB_CONNECTION_BUDGET // WEB_CONCURRENCY) instead of DB_POOL_MAXSIZE, so adding workers can't exceed the server limit
+DB_CONNECTION_BUDGET = int(os.getenv('DB_CONNECTION_BUDGET', 0))
 
+# Statement text and params are only logged at DEBUG, so the default level keeps the hot path free of formatting
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv('DB_LOG_LEVEL', 'WARNING'))
 
-# Create a connection pool
-dsn=f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={DB_SERVER};PORT=1433;DATABASE={DB_DATABASE};UID={DB_USER_NAME};PWD={DB_USER_PW};Encrypt=yes;TrustServerCertificate=no;Connection Timeout=30;'
-pool = None
 
+# Create connection pools: one primary for writes, plus optional read replicas (comma separated servers)
+def build_dsn(server: str) -> str:
+    return f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};PORT=1433;DATABASE={DB_DATABASE};UID={DB_USER_NAME};PWD={DB_USER_PW};Encrypt=yes;TrustServerCertificate=no;Connection Timeout=30;'
 
-async def create_pool():
-    """Create a pool to execute later queries under.
+dsn = build_dsn(DB_SERVER)
+replica_dsns = [build_dsn(server.strip()) for server in os.getenv('DB_REPLICA_SERVERS', '').split(',') if server.strip()]
+PRIMARY_POOL = 'primary'
+pools = {}  # name: pool
+replica_pool_names = []
+outstanding_requests = {}  # name: connections currently checked out, for least outstanding routing
+pool_metrics = PoolMetrics()
+
+# Opt-in result cache, see cache_sql_query for the per call keyword args
+query_cache = QueryCache(
+    max_bytes=int(os.getenv('DB_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    default_ttl=float(os.getenv('DB_CACHE_DEFAULT_TTL', 30))
+)
+
+# Shared by every retried call, so workers stop hammering the server while it is down
+db_circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('DB_BREAKER_FAILURE_THRESHOLD', 5)),
+    reset_timeout=float(os.getenv('DB_BREAKER_RESET_TIMEOUT', 30))
+)
+
+
+def worker_pool_maxsize() -> int:
+    """Max connections per pool in this process: the worker's share of DB_CONNECTION_BUDGET, or DB_POOL_MAXSIZE.
+
+    Read when the pool is created (after gunicorn forks the worker and sets WEB_CONCURRENCY), not at import.
+    """
+    if DB_CONNECTION_BUDGET <= 0:
+        return DB_POOL_MAXSIZE
+    workers = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+    return max(1, DB_CONNECTION_BUDGET // workers)
+
+
+async def create_pool(name: str = PRIMARY_POOL, pool_dsn: str = None, replica: bool = False, minsize: int = DB_POOL_MINSIZE, maxsize: int = None, pool_recycle: int = DB_POOL_RECYCLE, warm_up: bool = True):
+    """Create a named pool to execute later queries under.
+
+    Args:
+        name (optional, str): Pool name. Defaults to primary.
+        pool_dsn (optional, str): ODBC connection string. Defaults to the primary dsn.
+        replica (optional, bool): Whether the pool is a read replica that select queries can be routed to. Defaults to False.
+        minsize (optional, int): Connections to keep open. Defaults to DB_POOL_MINSIZE env var, or 1.
+        maxsize (optional, int): Max concurrent connections. Defaults to worker_pool_maxsize() (DB_POOL_MAXSIZE env var, or 10, without a connection budget).
+        pool_recycle (optional, int): Seconds before a connection is recycled. Defaults to DB_POOL_RECYCLE env var, or 25 minutes.
+        warm_up (optional, bool): Ping minsize connections at startup so the first requests don't pay for connection setup. Defaults to True.
+    """
+    maxsize = maxsize or worker_pool_maxsize()
+    new_pool = await aioodbc.create_pool(dsn=pool_dsn or dsn, minsize=min(minsize, maxsize), maxsize=maxsize, pool_recycle=pool_recycle)
+    register_pool(name, new_pool, replica=replica)
+    if warm_up:
+        await warm_up_pool(name)
+
+
+async def create_pools(warm_up: bool = True):
+    """Create the primary pool plus one pool per server in DB_REPLICA_SERVERS.
+    """
+    await create_pool(PRIMARY_POOL, dsn, warm_up=warm_up)
+    for i, replica_dsn in enumerate(replica_dsns):
+        await create_pool(f'replica_{i + 1}', replica_dsn, replica=True, warm_up=warm_up)
+
+
+def register_pool(name: str, new_pool, replica: bool = False):
+    """Register an already created pool, ex: an aioodbc pool or a local stand-in from src.startup.sqlite_pool.
+
+    Args:
+        name (str): Pool name.
+        new_pool: Pool exposing acquire/release/close/wait_closed and size stats like aioodbc.
+        replica (optional, bool): Whether select queries can be routed to it. Defaults to False.
+    """
+    pools[name] = new_pool
+    outstanding_requests[name] = 0
+    if replica and name not in replica_pool_names:
+        replica_pool_names.append(name)
+
+
+READ_ONLY_PATTERN = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+WRITE_KEYWORD_PATTERN = re.compile(r'\b(INTO|INSERT|UPDATE|DELETE|MERGE|EXEC|EXECUTE|DROP|ALTER|CREATE|TRUNCATE)\b', re.IGNORECASE)
+
+
+def is_read_only_statement(sql_query_statement: str) -> bool:
+    """Conservative check for select only statements. Anything that might write (SELECT INTO, CTE + DML, EXEC) is treated as a write.
+    """
+    return bool(READ_ONLY_PATTERN.match(sql_query_statement)) and not WRITE_KEYWORD_PATTERN.search(sql_query_statement)
+
+
+def choose_pool_name(read_only: bool = False) -> str:
+    """Route reads to the replica with the fewest outstanding requests, everything else to the primary.
+    """
+    if read_only and replica_pool_names:
+        return min(replica_pool_names, key=outstanding_requests.__getitem__)
+    return PRIMARY_POOL
+
+
+async def warm_up_pool(name: str = PRIMARY_POOL):
+    """Check out minsize connections at once and ping each, replacing any that are dead.
+    """
+    async def ping_one():
+        async with acquire_connection(query_context='warm_up', pre_ping=True, pool_name=name):
+            pass
+    await asyncio.gather(*[ping_one() for _ in range(pools[name].minsize)])
+
+
+async def ping_connection(connection) -> bool:
+    """Run a trivial query to check the connection is still alive.
+    """
+    try:
+        async with connection.cursor() as cursor:
+            await cursor.execute('SELECT 1')
+            await cursor.fetchone()
+        return True
+    except Exception:
+        return False
+
+
+@asynccontextmanager
+async def acquire_connection(query_context: str = None, timeout: float = DB_ACQUIRE_TIMEOUT, pre_ping: bool = DB_PRE_PING, read_only: bool = False, pool_name: str = None):
+    """Acquire a pooled connection with a timeout and optional pre-ping, recording wait time and hold time metrics.
+
+    Args:
+        query_context (optional, str): Label for the query latency histogram.
+        timeout (optional, float): Seconds to wait for a free connection. Defaults to DB_ACQUIRE_TIMEOUT env var, or 10.
+        pre_ping (optional, bool): Ping before handing out the connection and swap out dead ones. Defaults to DB_PRE_PING env var, or True.
+        read_only (optional, bool): Allow routing to a read replica. Defaults to False (primary).
+        pool_name (optional, str): Use this pool instead of routing.
+
+    Raises:
+        PoolExhaustedError: No connection became free within the timeout.
+
+    Yields:
+        Connection: aioodbc connection, released back to the pool on exit.
+    """
+    name = pool_name or choose_pool_name(read_only)
+    selected_pool = pools[name]
+    outstanding_requests[name] += 1
+    try:
+        start = time.perf_counter()
+        try:
+            connection = await asyncio.wait_for(selected_pool.acquire(), timeout=timeout)
+            if pre_ping and not await ping_connection(connection):
+                pool_metrics.dead_connections += 1
+                logger.warning('Discarding dead pooled connection from %s', name)
+                await connection.close()
+                await selected_pool.release(connection)
+                connection = await asyncio.wait_for(selected_pool.acquire(), timeout=max(0.001, timeout - (time.perf_counter() - start)))
+        except asyncio.TimeoutError as e:
+            pool_metrics.acquire_timeouts += 1
+            logger.warning('Timed out waiting %.1fs for a pooled connection from %s', timeout, name)
+            raise PoolExhaustedError(f'No connection from pool {name} became free within {timeout}s') from e
+
+        acquired = time.perf_counter()
+        pool_metrics.acquire_wait.observe(acquired - start)
+        try:
+            yield connection
+        finally:
+            pool_metrics.observe_query(query_context, time.perf_counter() - acquired)
+            await selected_pool.release(connection)
+    finally:
+        # close_pool may have dropped the counter while this connection was checked out
+        if name in outstanding_requests:
+            outstanding_requests[name] -= 1
+
+
+def get_pool_metrics() -> dict:
+    """Pool saturation, acquire wait and per query_context latency metrics.
     """
-    global pool
-    pool = await aioodbc.create_pool(dsn=dsn, pool_recycle=25*60)
+    metrics = pool_metrics.to_dict(pools)
+    for name, pool_stats in metrics['pools'].items():
+        pool_stats['outstanding_requests'] = outstanding_requests.get(name, 0)
+        pool_stats['replica'] = name in replica_pool_names
+    return metrics
 
 
-async def close_pool():
-    """Close out the pool before shutting down.
+async def close_pool(name: str = PRIMARY_POOL):
+    """Close out a pool before shutting down.
     """
-    global pool
-    pool.close()
-    await pool.wait_closed()
+    closing_pool = pools.pop(name)
+    outstanding_requests.pop(name, None)
+    if name in replica_pool_names:
+        replica_pool_names.remove(name)
+    closing_pool.close()
+    await closing_pool.wait_closed()
 
 
-def retry_sql_query(retries=3, delay=1):
-    """Retry sql query in case of bad connections. TODO: Implement more specific error catching and verify decorator fully async.
+async def close_pools():
+    """Close out every pool before shutting down.
+    """
+    for name in list(pools):
+        await close_pool(name)
+
+
+def database_http_error(error: Exception) -> HTTPException:
+    """HTTPException for a failed database call: 503 when the database is unavailable (open breaker) or every pooled
+    connection is busy, 500 otherwise.
+    """
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(status_code=503, detail="The database is temporarily unavailable.")
+    if isinstance(error, PoolExhaustedError):
+        return HTTPException(status_code=503, detail="The database is busy, try again shortly.")
+    return HTTPException(status_code=500, detail="An error occurred during the database query.")
+
+
+def retry_sql_query(retries=3, delay=1, policy: RetryPolicy = None, circuit_breaker: CircuitBreaker = None):
+    """Retry sql query on transient errors (connection drops, deadlocks, timeouts) with jittered exponential backoff.
+
+    Permanent errors fail on the first attempt. Failures are converted to HTTPException here, after retrying is decided.
 
     Args:
-        retries (int, optional): Number of retry attempts. Defaults to 3.
-        delay (int, optional): How many seconds to wait before retry. Defaults to 1.
+        retries (int, optional): Number of attempts, used when no policy is given. Defaults to 3.
+        delay (int, optional): Base backoff in seconds, used when no policy is given. Defaults to 1.
+        policy (RetryPolicy, optional): Full retry policy (attempts, backoff, overall deadline).
+        circuit_breaker (CircuitBreaker, optional): Breaker to consult and update. Defaults to db_circuit_breaker.
     """
+    retry_policy = policy or RetryPolicy(retries=retries, base_delay=delay)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            for _ in range(retries):
+            breaker = circuit_breaker or db_circuit_breaker
+            deadline = time.monotonic() + retry_policy.deadline
+            attempt = 0
+            while True:
                 try:
-                    return await func(*args, **kwargs)
+                    return await breaker.call(func, *args, **kwargs)
+                except CircuitOpenError as e:
+                    logger.warning('Failing fast: %s', e)
+                    raise database_http_error(e)
+                except PoolExhaustedError as e:
+                    raise database_http_error(e) from e
                 except Exception as e:
-                    print(f'Retry on error {e}')
-                    if _ == retries - 1:
-                        raise e
-                await asyncio.sleep(delay)
+                    transient = is_transient_error(e)
+                    attempt += 1
+                    backoff = retry_policy.backoff(attempt)
+                    if not transient or attempt >= retry_policy.retries or time.monotonic() + backoff > deadline:
+                        raise database_http_error(e) from e
+                    logger.warning('Retry %d on transient error %s (sleeping %.2fs)', attempt, e, backoff)
+                    await asyncio.sleep(backoff)
         return wrapper
     return decorator
 
 
+@cache_sql_query(query_cache)
 @retry_sql_query()
-async def run_query(sql_query_statement: str, params: list = None, query_context: str = None, extra_tabs: int = 0, exec_many: bool = False) -> list[dict]:
-    """Run a query against database pool. TODO: Change all prints to logging.
+async def run_query(sql_query_statement: str, params: list = None, query_context: str = None, extra_tabs: int = 0, exec_many: bool = False, use_replica: bool = None, cache_ttl: float = None, cache_tags: list[str] = None, invalidate_tags: list[str] = None) -> list[dict]:
+    """Run a query against database pool.
 
     Args:
         sql_query_statement (str): Query statement (ex: SELECT * FROM schema.table WHERE id = ?).
         params (optional, list): list of params to pipe into the query.
         query_context (optional, str): String representing context of the query, for displaying/logging/debug.
         extra_tabs (optional, int): Number of extra tabs to insert. Defaults to 0.
-        exec_many (optional, bool): Whether to exec many or single. Defaults to false (exec single).
+        exec_many (optional, bool): Whether to exec many or single. Defaults to false (exec single). Exec many runs as one transaction with adaptive batch sizes, see bulk_insert for large loads.
+        use_replica (optional, bool): Force (True) or prevent (False) routing to a read replica. Defaults to None (replica for select only statements).
+        cache_ttl (optional, float): Cache the result for this many seconds (keyword only). Defaults to None (no caching).
+        cache_tags (optional, list[str]): Tags to attach to the cached result for later invalidation (keyword only).
+        invalidate_tags (optional, list[str]): Tags to invalidate after the query succeeds, for writes (keyword only).
 
     Raises:
         HTTPException: Exception if the query failed.
@@ -69,24 +296,25 @@ async def run_query(sql_query_statement: str, params: list = None, query_context
     Returns:
         list[dict]: List of rows returned in column_name:column_value dict format.
     """
-    if query_context is not None:
-        print('\n' + '\t'*extra_tabs + '+'*10 + f' Running Select Query {query_context} ' + '+'*10)
-    else:
-        print('\n' + '\t'*extra_tabs + '+'*10 + ' Running Select Query ' + '+'*10)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug('%sRunning Select Query %s: %s', '\t'*extra_tabs, query_context or '', sql_query_statement, extra={'query_context': query_context})
 
     try:
-        async with pool.acquire() as connection:
+        read_only = use_replica if use_replica is not None else (not exec_many and is_read_only_statement(sql_query_statement))
+        async with acquire_connection(query_context=query_context, read_only=read_only) as connection:
             async with connection.cursor() as cursor:
-                print('\t'*extra_tabs  + 'Executing Query...')
-                print('\t'*extra_tabs  + sql_query_statement)
                 if params is not None:
                     if exec_many:
-                        batch_size = 1000
-                        for i in range(0, len(params), batch_size):
-                            batch_params = params[i:i + batch_size]
-                            await cursor.executemany(sql_query_statement, batch_params)
+                        try:
+                            await execute_many_adaptive(cursor, sql_query_statement, params)
+                            await connection.commit()
+                        except Exception:
+                            await connection.rollback()
+                            raise
                     else:
-                        print('\t'*extra_tabs + f"Query Params: {','.join([str(param) for param in params])}.")
+                        if debug:
+                            logger.debug('%sQuery Params: %s', '\t'*extra_tabs, ','.join([str(param) for param in params]), extra={'query_context': query_context})
                         await cursor.execute(sql_query_statement, params)
                 else:
                     await cursor.execute(sql_query_statement)
@@ -94,24 +322,140 @@ async def run_query(sql_query_statement: str, params: list = None, query_context
                     column_names = [column[0] for column in cursor.description]
                     rows = await cursor.fetchall()
                     result = [dict(zip(column_names, row)) for row in rows]
-                    print('\t'*extra_tabs  + '-'*10 + ' Select Query Completed ' + '-'*10)
+                    if debug:
+                        logger.debug('%sSelect Query Completed (%d rows)', '\t'*extra_tabs, len(result), extra={'query_context': query_context})
                     return result
                 else:
-                    print('\t'*extra_tabs  + '-'*10 + ' Select Query Completed ' + '-'*10)
+                    if debug:
+                        logger.debug('%sSelect Query Completed', '\t'*extra_tabs, extra={'query_context': query_context})
                     return True
     except Exception as e:
-        print('\t'*extra_tabs  + f"Error occurred during database query: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred during the database query.")
+        logger.error('%sError occurred during database query %s: %s', '\t'*extra_tabs, query_context or '', e, extra={'query_context': query_context})
+        raise
+
+
+async def execute_many_adaptive(cursor, sql_query_statement: str, params: list, batch_size: int = 1000, target_batch_seconds: float = 0.5, max_batch_size: int = 50000) -> int:
+    """Executemany in batches, resizing each batch from the measured round trip time of the previous one.
+
+    Args:
+        cursor: Open aioodbc cursor.
+        sql_query_statement (str): Parameterized statement to execute per row.
+        params (list): List of param rows.
+        batch_size (optional, int): Starting batch size. Defaults to 1000.
+        target_batch_seconds (optional, float): Round trip time to aim for per batch. Defaults to 0.5.
+        max_batch_size (optional, int): Upper bound on batch size. Defaults to 50000.
+
+    Returns:
+        int: Number of rows sent.
+    """
+    # Let pyodbc send the whole parameter array in one round trip instead of one per row.
+    cursor._impl.fast_executemany = True
+
+    rows_sent = 0
+    while rows_sent < len(params):
+        batch_params = params[rows_sent:rows_sent + batch_size]
+        start = time.perf_counter()
+        await cursor.executemany(sql_query_statement, batch_params)
+        elapsed = time.perf_counter() - start
+        rows_sent += len(batch_params)
 
+        # Grow at most 2x (or shrink at most 2x) per step to avoid overreacting to one noisy round trip
+        if elapsed > 0:
+            ideal_batch_size = int(len(batch_params) * target_batch_seconds / elapsed)
+            batch_size = max(1, min(max_batch_size, batch_size * 2, max(batch_size // 2, ideal_batch_size)))
+    return rows_sent
 
+
+async def bulk_insert(table_name: str, column_names: list[str], rows: list, shards: int = 4, batch_size: int = 1000, target_batch_seconds: float = 0.5, max_batch_size: int = 50000, extra_tabs: int = 0) -> dict:
+    """Bulk insert rows by splitting them across several pooled connections in parallel.
+
+    Each shard runs in its own transaction, so a failed shard is rolled back while the others commit.
+
+    Args:
+        table_name (str): Target table (ex: stg.tbl).
+        column_names (list[str]): Columns to insert, in the same order as each row.
+        rows (list): List of row tuples/lists to insert.
+        shards (optional, int): Number of connections to load in parallel. Capped at the pool max size. Defaults to 4.
+        batch_size (optional, int): Starting executemany batch size per shard. Defaults to 1000.
+        target_batch_seconds (optional, float): Round trip time to aim for per batch. Defaults to 0.5.
+        max_batch_size (optional, int): Upper bound on batch size. Defaults to 50000.
+        extra_tabs (optional, int): Number of extra tabs to insert. Defaults to 0.
+
+    Raises:
+        HTTPException: Exception if any shard failed.
+
+    Returns:
+        dict: Load stats (rows, shards, seconds, rows_per_second).
+    """
+    if not rows:
+        return {'rows': 0, 'shards': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+
+    sql_query_statement = f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES ({', '.join(['?'] * len(column_names))})"
+    logger.debug('%sRunning Bulk Insert %s: %s', '\t'*extra_tabs, table_name, sql_query_statement)
+
+    shards = max(1, min(shards, pools[PRIMARY_POOL].maxsize, len(rows)))
+    shard_size = -(-len(rows) // shards)
+    shard_rows = [rows[i:i + shard_size] for i in range(0, len(rows), shard_size)]
+
+    async def insert_shard(rows_in_shard: list) -> int:
+        async with acquire_connection(query_context=f'bulk_insert {table_name}') as connection:
+            async with connection.cursor() as cursor:
+                try:
+                    rows_sent = await execute_many_adaptive(cursor, sql_query_statement, rows_in_shard, batch_size, target_batch_seconds, max_batch_size)
+                    await connection.commit()
+                    return rows_sent
+                except Exception:
+                    await connection.rollback()
+                    raise
+
+    start = time.perf_counter()
+    shard_results = await asyncio.gather(*[insert_shard(rows_in_shard) for rows_in_shard in shard_rows], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    errors = [result for result in shard_results if isinstance(result, Exception)]
+    rows_committed = sum(result for result in shard_results if not isinstance(result, Exception))
+    if errors:
+        logger.error('%sError occurred during bulk insert (%d of %d shards rolled back, %d rows committed): %s', '\t'*extra_tabs, len(errors), len(shard_rows), rows_committed, errors[0])
+        raise HTTPException(status_code=500, detail="An error occurred during the bulk insert.")
+
+    stats = {
+        'rows': rows_committed,
+        'shards': len(shard_rows),
+        'seconds': elapsed,
+        'rows_per_second': rows_committed / elapsed if elapsed > 0 else float(rows_committed)
+    }
+    logger.info('%sBulk Insert Completed %s (%d rows, %.0f rows/sec)', '\t'*extra_tabs, table_name, stats['rows'], stats['rows_per_second'], extra=stats)
+    return stats
+
+
+@lru_cache(maxsize=1024)
+def stored_procedure_statement(stored_procedure_name: str, param_names: tuple[str, ...]) -> str:
+    """Build the EXEC call template once per (proc, param signature) and reuse it.
+
+    Identical statement text also lets SQL Server reuse the cached plan instead of compiling a new one per call.
+
+    Args:
+        stored_procedure_name (str): Stored procedure name.
+        param_names (tuple[str, ...]): Param names, in the order their values will be bound.
+
+    Returns:
+        str: Parameterized statement (ex: EXEC proc @a = ?, @b = ?).
+    """
+    return f"EXEC {stored_procedure_name} " + ", ".join([f"@{name} = ?" for name in param_names])
+
+
+@cache_sql_query(query_cache)
 @retry_sql_query()
-async def execute_store_procedure(stored_procedure_name: str, params: dict, extra_tabs: int = 0) -> list[dict]:
-    """Execute Parameterized Stored Proc. TODO: Change all prints to logging.
+async def execute_store_procedure(stored_procedure_name: str, params: dict, extra_tabs: int = 0, cache_ttl: float = None, cache_tags: list[str] = None, invalidate_tags: list[str] = None) -> list[dict]:
+    """Execute Parameterized Stored Proc.
 
     Args:
         stored_procedure_name (str): Stored procedure name.
         params (dict): Params in the param_name:param_value dict format.
         extra_tabs (optional, int): Number of extra tabs to insert. Defaults to 0.
+        cache_ttl (optional, float): Cache the result for this many seconds (keyword only). Defaults to None (no caching).
+        cache_tags (optional, list[str]): Tags to attach to the cached result for later invalidation (keyword only).
+        invalidate_tags (optional, list[str]): Tags to invalidate after the proc succeeds, for writes (keyword only).
 
     Raises:
         HTTPException: Exception if proc failed.
@@ -119,24 +463,188 @@ async def execute_store_procedure(stored_procedure_name: str, params: dict, extr
     Returns:
         list[dict]: List of rows returned in column_name:column_value dict format.
     """
-    print('\n' + '\t'*extra_tabs + '+'*10 + f' Running Stored Proc {stored_procedure_name} ' + '+'*10)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    sql_query_statement = stored_procedure_statement(stored_procedure_name, tuple(params))
+    if debug:
+        logger.debug('%sRunning Stored Proc %s: %s', '\t'*extra_tabs, stored_procedure_name, sql_query_statement, extra={'query_context': stored_procedure_name})
+        logger.debug('%sStored Proc Params: %s', '\t'*extra_tabs, ','.join([str(param) for param in params.values()]), extra={'query_context': stored_procedure_name})
     try:
-        async with pool.acquire() as connection:
+        async with acquire_connection(query_context=stored_procedure_name) as connection:
             async with connection.cursor() as cursor:
-                sql_query_statement = f"EXEC {stored_procedure_name} " + ", ".join([f"@{name} = ?" for name in params])
-                print('\t'*extra_tabs + sql_query_statement)
-                print('\t'*extra_tabs)
-                print(*params.values())
                 await cursor.execute(sql_query_statement, *params.values())
                 if cursor.description:
                     column_names = [column[0] for column in cursor.description]
                     rows = await cursor.fetchall()
                     result = [dict(zip(column_names, row)) for row in rows]
-                    print('\t'*extra_tabs  + '-'*10 + ' Stored Proc Completed ' + '-'*10)
+                    if debug:
+                        logger.debug('%sStored Proc Completed (%d rows)', '\t'*extra_tabs, len(result), extra={'query_context': stored_procedure_name})
                     return result
                 else:
-                    print('\t'*extra_tabs  + '-'*10 + ' Stored Proc Completed ' + '-'*10)
+                    if debug:
+                        logger.debug('%sStored Proc Completed', '\t'*extra_tabs, extra={'query_context': stored_procedure_name})
                     return True
     except Exception as e:
-        print('\t'*extra_tabs + f"Error occurred during database query: {e}")
-        raise HTTPException(status_code=500, detail="An error occurred during the database query.")
+        logger.error('%sError occurred during stored proc %s: %s', '\t'*extra_tabs, stored_procedure_name, e, extra={'query_context': stored_procedure_name})
+        raise
+
+
+def rows_to_columns(column_names: list[str], rows: list, as_numpy: bool = False) -> dict:
+    """Transpose a batch of rows into a column_name:column_values dict.
+
+    Args:
+        column_names (list[str]): Column names from the cursor description.
+        rows (list): Batch of row tuples returned by fetchmany.
+        as_numpy (optional, bool): Whether to return each column as a NumPy array. Defaults to False (lists).
+
+    Returns:
+        dict: Column values keyed by column name.
+    """
+    columns = zip(*rows) if rows else [()] * len(column_names)
+    if as_numpy:
+        import numpy as np
+        return {name: np.asarray(values) for name, values in zip(column_names, columns)}
+    return {name: list(values) for name, values in zip(column_names, columns)}
+
+
+async def stream_query(sql_query_statement: str, params: list = None, query_context: str = None, extra_tabs: int = 0, batch_size: int = 5000, columnar: bool = False, as_numpy: bool = False, use_replica: bool = None) -> AsyncGenerator[dict, None]:
+    """Run a select query and stream the result in fetchmany batches instead of loading it all into memory.
+
+    Not wrapped in retry_sql_query, since a partially consumed stream cannot be safely replayed. To answer an HTTP
+    request, use start_query_stream, which surfaces failures before the response starts.
+
+    Args:
+        sql_query_statement (str): Query statement (ex: SELECT * FROM schema.table WHERE id = ?).
+        params (optional, list): list of params to pipe into the query.
+        query_context (optional, str): String representing context of the query, for displaying/logging/debug.
+        extra_tabs (optional, int): Number of extra tabs to insert. Defaults to 0.
+        batch_size (optional, int): Number of rows to fetch per round trip. Defaults to 5000.
+        columnar (optional, bool): Yield one column_name:column_values dict per batch instead of one dict per row. Defaults to False.
+        as_numpy (optional, bool): With columnar, return each column as a NumPy array. Defaults to False.
+        use_replica (optional, bool): Force (True) or prevent (False) routing to a read replica. Defaults to None (replica for select only statements).
+
+    Raises:
+        Exception: The database error, logged here (ex: PoolExhaustedError, a pyodbc error).
+
+    Yields:
+        AsyncGenerator[dict, None]: Rows in column_name:column_value format, or column batches if columnar.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug('%sStreaming Select Query %s: %s', '\t'*extra_tabs, query_context or '', sql_query_statement, extra={'query_context': query_context})
+
+    try:
+        read_only = use_replica if use_replica is not None else is_read_only_statement(sql_query_statement)
+        async with acquire_connection(query_context=query_context, read_only=read_only) as connection:
+            async with connection.cursor() as cursor:
+                if params is not None:
+                    await cursor.execute(sql_query_statement, params)
+                else:
+                    await cursor.execute(sql_query_statement)
+                if not cursor.description:
+                    return
+                column_names = [column[0] for column in cursor.description]
+                row_count = 0
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    if columnar:
+                        yield rows_to_columns(column_names, rows, as_numpy=as_numpy)
+                    else:
+                        for row in rows:
+                            yield dict(zip(column_names, row))
+                if debug:
+                    logger.debug('%sStreaming Select Query Completed (%d rows)', '\t'*extra_tabs, row_count, extra={'query_context': query_context})
+    except Exception as e:
+        logger.error('%sError occurred during database query %s: %s', '\t'*extra_tabs, query_context or '', e, extra={'query_context': query_context})
+        raise
+
+
+async def start_query_stream(sql_query_statement: str, params: list = None, query_context: str = None, batch_size: int = 5000, columnar: bool = False, as_numpy: bool = False, use_replica: bool = None, circuit_breaker: CircuitBreaker = None) -> AsyncGenerator[dict, None]:
+    """Run stream_query up to its first batch (acquire, execute, first fetch) through the circuit breaker, so a
+    failure can still be answered with a 503/500 like retry_sql_query, before any response has been sent.
+
+    Args are the same as stream_query, plus circuit_breaker (optional, CircuitBreaker): Defaults to db_circuit_breaker.
+
+    Raises:
+        HTTPException: The query failed to start (503 for an open breaker or exhausted pool, 500 otherwise).
+
+    Returns:
+        AsyncGenerator[dict, None]: The full result, starting with the already fetched first item.
+    """
+    result_stream = stream_query(
+        sql_query_statement,
+        params=params,
+        query_context=query_context,
+        batch_size=batch_size,
+        columnar=columnar,
+        as_numpy=as_numpy,
+        use_replica=use_replica
+    )
+    try:
+        first_item = await (circuit_breaker or db_circuit_breaker).call(result_stream.__anext__)
+    except StopAsyncIteration:
+        first_item = None
+    except Exception as e:
+        raise database_http_error(e) from e
+
+    async def resumed() -> AsyncGenerator[dict, None]:
+        if first_item is None:
+            return
+        try:
+            yield first_item
+            async for item in result_stream:
+                yield item
+        finally:
+            # Releases the connection right away if the client goes away mid-stream
+            await result_stream.aclose()
+
+    return resumed()
+
+
+def ndjson_default(value):
+    """JSON fallback for values the standard encoder can't handle (datetime, Decimal, NumPy arrays/scalars).
+    """
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+async def ndjson_lines(result_stream: AsyncGenerator[dict, None]) -> AsyncGenerator[str, None]:
+    """Encode each item of a stream_query generator as a newline delimited JSON line.
+
+    The status line is already sent once streaming starts, so a failure part way through ends the stream with an
+    {"error": ...} line (stream_query has logged it) instead of an exception.
+    """
+    try:
+        async for item in result_stream:
+            yield json.dumps(item, default=ndjson_default) + '\n'
+    except Exception:
+        yield json.dumps({'error': 'An error occurred during the database query.'}) + '\n'
+
+
+async def stream_query_response(sql_query_statement: str, params: list = None, query_context: str = None, batch_size: int = 5000, columnar: bool = False) -> StreamingResponse:
+    """Build a FastAPI StreamingResponse that streams a query result as NDJSON.
+
+    Args:
+        sql_query_statement (str): Query statement (ex: SELECT * FROM schema.table WHERE id = ?).
+        params (optional, list): list of params to pipe into the query.
+        query_context (optional, str): String representing context of the query, for displaying/logging/debug.
+        batch_size (optional, int): Number of rows to fetch per round trip. Defaults to 5000.
+        columnar (optional, bool): Emit one line per column batch instead of one line per row. Defaults to False.
+
+    Raises:
+        HTTPException: The query failed before any row was sent (503 or 500, see start_query_stream).
+
+    Returns:
+        StreamingResponse: Response with one JSON object per line (application/x-ndjson).
+    """
+    result_stream = await start_query_stream(
+        sql_query_statement,
+        params=params,
+        query_context=query_context,
+        batch_size=batch_size,
+        columnar=columnar
+    )
+    return StreamingResponse(ndjson_lines(result_stream), media_type="application/x-ndjson")
@@ -0,0 +1,93 @@
+from bisect import bisect_left
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Fixed bucket latency histogram (seconds), cheap enough to update on every query.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q quantile (ex: 0.99).
+        """
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for upper_bound, bucket_count in zip(self.buckets, self.counts):
+            running += bucket_count
+            if running >= target:
+                return upper_bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for upper_bound, bucket_count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += bucket_count
+            buckets[str(upper_bound)] = cumulative
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': buckets
+        }
+
+
+class PoolMetrics:
+    """Acquire wait times, per query_context latency and connection health counters for the db pool.
+    """
+
+    def __init__(self):
+        self.acquire_wait = Histogram()
+        self.query_latency = {}  # query_context: Histogram
+        self.acquire_timeouts = 0
+        self.dead_connections = 0
+
+    def observe_query(self, query_context: str, seconds: float):
+        context = query_context or 'default'
+        histogram = self.query_latency.get(context)
+        if histogram is None:
+            histogram = self.query_latency[context] = Histogram()
+        histogram.observe(seconds)
+
+    def to_dict(self, pools: dict = None) -> dict:
+        """Snapshot of all metrics, plus in-use/idle counts for each of the given name:pool entries.
+        """
+        metrics = {
+            'acquire_wait_seconds': self.acquire_wait.to_dict(),
+            'query_latency_seconds': {context: histogram.to_dict() for context, histogram in self.query_latency.items()},
+            'acquire_timeouts': self.acquire_timeouts,
+            'dead_connections': self.dead_connections
+        }
+        if pools is not None:
+            metrics['pools'] = {
+                name: {
+                    'minsize': pool.minsize,
+                    'maxsize': pool.maxsize,
+                    'size': pool.size,
+                    'in_use': pool.size - pool.freesize,
+                    'idle': pool.freesize
+                }
+                for name, pool in pools.items()
+            }
+        return metrics
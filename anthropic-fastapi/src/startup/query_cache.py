@@ -0,0 +1,207 @@
+import sys
+import time
+import asyncio
+from collections import OrderedDict
+from functools import wraps
+
+
+def estimate_size(value) -> int:
+    """Rough size in bytes of a query result (list of row dicts, or True for statements without a result set).
+
+    Args:
+        value: Query result to measure.
+
+    Returns:
+        int: Approximate number of bytes held by the result.
+    """
+    if isinstance(value, list):
+        size = sys.getsizeof(value)
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, dict):
+                size += sum(sys.getsizeof(column_value) for column_value in row.values())
+        return size
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Async result cache with per entry TTL, a byte bounded LRU, tag based invalidation and single-flight loading.
+
+    Cached results are shared between callers, so they should be treated as read only.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 30):
+        """
+        Args:
+            max_bytes (optional, int): Upper bound on the estimated size of all cached results. Defaults to 64MB.
+            default_ttl (optional, float): TTL in seconds when a caller doesn't pass one. Defaults to 30.
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key: (value, expires_at, size, tags)
+        self._tag_keys = {}  # tag: set of keys
+        self._in_flight = {}  # key: asyncio.Task
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Build a cache key from the statement and params.
+        """
+        return repr(parts)
+
+    def get(self, key: str):
+        """Get a cached value, returning None on miss or expiry.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _, _ = entry
+        if expires_at <= time.monotonic():
+            self.expirations += 1
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: float = None, tags: list[str] = None):
+        """Store a value, evicting least recently used entries until under max_bytes.
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags or ())
+        self._entries[key] = (value, time.monotonic() + (ttl if ttl is not None else self.default_ttl), size, tags)
+        self.current_bytes += size
+        for tag in tags:
+            self._tag_keys.setdefault(tag, set()).add(key)
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, _, size, tags = self._entries.pop(key)
+        self.current_bytes -= size
+        for tag in tags:
+            tag_keys = self._tag_keys.get(tag)
+            if tag_keys is not None:
+                tag_keys.discard(key)
+                if not tag_keys:
+                    del self._tag_keys[tag]
+
+    def invalidate_tags(self, tags: list[str]) -> int:
+        """Drop every entry tagged with any of the given tags.
+
+        Args:
+            tags (list[str]): Tags to invalidate (ex: ['dim_employee']).
+
+        Returns:
+            int: Number of entries removed.
+        """
+        # Loads already in flight may have read pre-write data, so they shouldn't populate the cache
+        self._generation += 1
+        removed = 0
+        for tag in tags:
+            for key in list(self._tag_keys.get(tag, ())):
+                self._remove(key)
+                removed += 1
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        """Drop every entry.
+        """
+        self._generation += 1
+        self._entries.clear()
+        self._tag_keys.clear()
+        self.current_bytes = 0
+
+    async def get_or_load(self, key: str, loader, ttl: float = None, tags: list[str] = None):
+        """Return the cached value for key, or run loader once no matter how many callers are waiting on it.
+
+        Args:
+            key (str): Cache key, see make_key.
+            loader: Zero argument coroutine function producing the value.
+            ttl (optional, float): TTL in seconds. Defaults to default_ttl.
+            tags (optional, list[str]): Tags to attach for later invalidation.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, ttl, tags))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield so one cancelled caller doesn't cancel the load for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader, ttl: float, tags: list[str]):
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.set(key, value, ttl=ttl, tags=tags)
+        return value
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current size.
+        """
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'in_flight': len(self._in_flight),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+def cache_sql_query(cache: QueryCache):
+    """Opt-in result caching for query functions, driven by the cache_ttl, cache_tags and invalidate_tags keyword arguments.
+
+    Calls without cache_ttl go straight through. Logging only args (query_context, extra_tabs) are left out of the key.
+
+    Args:
+        cache (QueryCache): Cache to store results in.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache_ttl = kwargs.pop('cache_ttl', None)
+            cache_tags = kwargs.pop('cache_tags', None)
+            invalidate_tags = kwargs.pop('invalidate_tags', None)
+
+            if cache_ttl is None:
+                result = await func(*args, **kwargs)
+            else:
+                key_kwargs = sorted((name, value) for name, value in kwargs.items() if name not in ('query_context', 'extra_tabs'))
+                key = cache.make_key(func.__name__, args, key_kwargs)
+                result = await cache.get_or_load(key, lambda: func(*args, **kwargs), ttl=cache_ttl, tags=cache_tags)
+
+            if invalidate_tags:
+                cache.invalidate_tags(invalidate_tags)
+            return result
+        return wrapper
+    return decorator
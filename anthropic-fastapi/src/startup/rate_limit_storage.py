@@ -0,0 +1,159 @@
+import os
+import time
+import sqlite3
+import threading
+from math import floor
+from limits.errors import ConfigurationError
+from limits.storage.base import Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+# moving-window keeps one row per hit, so it isn't implemented here (limits raises NotImplementedError for it)
+SUPPORTED_STRATEGIES = ('fixed-window', 'sliding-window-counter')
+
+
+def check_strategy(storage_uri: str, strategy: str):
+    """Fail at startup rather than on the first request when the sqlite storage can't run the strategy.
+
+    Raises:
+        ConfigurationError: storage_uri is a sqlite:// URI and strategy isn't in SUPPORTED_STRATEGIES.
+    """
+    if storage_uri.startswith('sqlite://') and strategy not in SUPPORTED_STRATEGIES:
+        raise ConfigurationError(f"Rate limit strategy {strategy} isn't supported by sqlite:// storage, use one of {', '.join(SUPPORTED_STRATEGIES)} or redis://")
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """limits storage in a sqlite file, shared by every worker process on the host and kept across restarts.
+
+    Registered for sqlite:// URIs, ex: RATE_LIMIT_STORAGE_URI=sqlite:////tmp/rate_limits.db. Supports the fixed
+    window and sliding window counter strategies. The sliding window counter keeps two counter rows per key, so memory
+    stays O(1) per key, and checks both windows and increments in a single transaction, so concurrent workers can't
+    overshoot the limit.
+
+    Counter updates aren't batched: every hit is its own short transaction (WAL, synchronous=NORMAL). Buffering hits
+    in a process and flushing them later would let each worker spend its unflushed hits on top of what the others
+    already counted, which is the overshoot a shared storage is there to prevent.
+
+    For several hosts, use redis://host:6379 instead (same strategies, built into limits).
+    """
+    STORAGE_SCHEME = ['sqlite']
+    # Expired rows are purged once every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        """
+        Args:
+            uri (str): sqlite:///relative/path.db or sqlite:////absolute/path.db.
+            wrap_exceptions (optional, bool): Wrap sqlite errors in limits.errors.StorageError. Defaults to False.
+        """
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len('sqlite:///'):]
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._writes = 0
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork (ex: gunicorn --preload), so each process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)')
+            self._pid = os.getpid()
+        return self._connection
+
+    def _get(self, key: str, now: float) -> tuple[int, float]:
+        row = self.connection.execute('SELECT count, expires_at FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+        return row if row is not None else (0, now)
+
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        # Expired counters restart at amount with a fresh expiry
+        return self.connection.execute(
+            '''INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(key) DO UPDATE SET
+                   count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                   expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+               RETURNING count''',
+            (key, amount, now + expiry, now, now)
+        ).fetchone()[0]
+
+    def _purge(self, now: float):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.connection.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        with self._lock:
+            count = self._incr(key, expiry, amount, now)
+            self._purge(now)
+        return count
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._get(key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            return self._get(key, time.time())[1]
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self.connection.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self.connection.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        with self._lock:
+            return self.connection.execute('DELETE FROM rate_limits').rowcount
+
+    def _sliding_window(self, key: str, expiry: int, now: float) -> tuple[int, float, int, float, str]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(previous_key, now)[0]
+        current_count = self._get(current_key, now)[0]
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl, current_key
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so the check and the increment are atomic across processes
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                previous_count, previous_ttl, current_count, _, current_key = self._sliding_window(key, expiry, now)
+                if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                    acquired = False
+                else:
+                    # The current window's counter also serves as the next window's previous counter
+                    self._incr(current_key, 2 * expiry, amount, now)
+                    acquired = True
+                self.connection.execute('COMMIT')
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            if acquired:
+                self._purge(now)
+        return acquired
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        with self._lock:
+            return self._sliding_window(key, expiry, time.time())[:4]
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
@@ -0,0 +1,59 @@
+import os
+import re
+import json
+
+
+# Could later add https://xxx.netlify.app/, https://xxx.azurewebsites.net/
+APPROVED_REFERERS = [
+    referer.strip()
+    for referer in os.getenv('APPROVED_REFERERS', 'http://localhost:8000/,http://localhost:8080/,http://localhost:5173/').split(',')
+    if referer.strip()
+]
+
+
+def compile_prefixes(prefixes: list[str]) -> re.Pattern:
+    """One bytes regex matching any of the prefixes, so a header is checked in a single match call.
+    """
+    if not prefixes:
+        return re.compile(b'(?!)')  # matches nothing
+    # Longest first, so a shorter prefix can't shadow a longer one in the alternation
+    return re.compile(b'|'.join(re.escape(prefix.encode('latin-1')) for prefix in sorted(prefixes, key=len, reverse=True)))
+
+
+class RefererMiddleware:
+    """Pure ASGI middleware rejecting requests whose Referer header doesn't start with an approved prefix (requests
+    without a Referer pass). Approved requests go straight to the app, so streaming responses aren't wrapped or
+    buffered.
+    """
+
+    def __init__(self, app, approved_referers: list[str] = None):
+        """
+        Args:
+            app: ASGI app to wrap.
+            approved_referers (optional, list[str]): Allowed Referer prefixes. Defaults to APPROVED_REFERERS (env, comma separated).
+        """
+        self.app = app
+        self.pattern = compile_prefixes(APPROVED_REFERERS if approved_referers is None else approved_referers)
+        body = json.dumps({'detail': 'Not Authorized'}).encode()
+        self.rejection_start = {
+            'type': 'http.response.start',
+            'status': 400,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'www-authenticate', b'Bearer')
+            ]
+        }
+        self.rejection_body = {'type': 'http.response.body', 'body': body}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            # ASGI header names are lowercase bytes
+            for name, value in scope['headers']:
+                if name == b'referer':
+                    if self.pattern.match(value) is None:
+                        await send(self.rejection_start)
+                        await send(self.rejection_body)
+                        return
+                    break
+        await self.app(scope, receive, send)
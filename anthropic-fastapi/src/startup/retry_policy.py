@@ -0,0 +1,152 @@
+import time
+import random
+import asyncio
+
+
+# SQLSTATE classes that are worth retrying: connection failures, deadlock/serialization failures and timeouts
+TRANSIENT_SQLSTATES = {'08S01', '08001', '08004', '08007', '40001', 'HYT00', 'HYT01'}
+
+# SQL Server / Azure SQL native error numbers that show up in the message for transient failures
+# (1205 deadlock victim, 40613/40501/40197/49918-49920 service busy or failover, 10928/10929 resource limits, 233/10053/10054/10060/64 connection drops)
+TRANSIENT_NATIVE_ERRORS = {'1205', '40613', '40501', '40197', '49918', '49919', '49920', '10928', '10929', '233', '10053', '10054', '10060', '64'}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Classify a database error as transient (retry) or permanent (fail immediately, ex: syntax or constraint errors).
+
+    Args:
+        error (Exception): Exception raised by aioodbc/pyodbc.
+
+    Returns:
+        bool: True if retrying has a reasonable chance of succeeding.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+
+    # pyodbc errors carry (sqlstate, message) in args
+    args = getattr(error, 'args', ())
+    if args and isinstance(args[0], str) and args[0] in TRANSIENT_SQLSTATES:
+        return True
+    message = ' '.join(str(arg) for arg in args)
+    return any(f'({native_error})' in message for native_error in TRANSIENT_NATIVE_ERRORS)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by a retry count and an overall deadline.
+    """
+
+    def __init__(self, retries: int = 3, base_delay: float = 0.2, max_delay: float = 5, deadline: float = 15):
+        """
+        Args:
+            retries (optional, int): Max attempts, including the first one. Defaults to 3.
+            base_delay (optional, float): Backoff for the first retry in seconds, doubled each attempt. Defaults to 0.2.
+            max_delay (optional, float): Cap on a single backoff in seconds. Defaults to 5.
+            deadline (optional, float): Overall time budget in seconds across all attempts. Defaults to 15.
+        """
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to sleep after the given failed attempt (1 based). Full jitter spreads retries from many workers apart.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the circuit breaker is open.
+    """
+
+
+class PoolExhaustedError(Exception):
+    """No pooled connection became free in time. The pool is saturated, which says nothing about the server's health,
+    so it is neither retried nor counted by the circuit breaker.
+    """
+
+
+class CircuitBreaker:
+    """Fail fast after repeated transient failures, then let a single trial call through once reset_timeout has passed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        Args:
+            failure_threshold (optional, int): Consecutive transient failures before opening. Defaults to 5.
+            reset_timeout (optional, float): Seconds to stay open before allowing a trial call. Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self) -> bool:
+        """Check whether a call may proceed.
+
+        Returns:
+            bool: True if this call is the half open trial.
+
+        Raises:
+            CircuitOpenError: The breaker is open, or half open with a trial call already running.
+        """
+        state = self.state
+        if state == 'open' or (state == 'half_open' and self.trial_in_flight):
+            raise CircuitOpenError('Database circuit breaker is open.')
+        if state == 'half_open':
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.trial_in_flight or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """Free the trial slot without a verdict, ex: the trial call was cancelled before the server answered.
+        """
+        self.trial_in_flight = False
+
+    async def call(self, func, *args, **kwargs):
+        """Run one attempt through the breaker, recording its outcome.
+
+        Raises:
+            CircuitOpenError: The breaker rejected the call.
+        """
+        is_trial = self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except PoolExhaustedError:
+            if is_trial:
+                self.release_trial()
+            raise
+        except Exception as e:
+            # A permanent error still means the server answered
+            if is_transient_error(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled (ex: client disconnect or an outer timeout): otherwise a half open breaker would wait on this trial forever.
+            # Only the trial call frees the slot, a call started before the breaker opened mustn't free another call's trial
+            if is_trial:
+                self.release_trial()
+            raise
+        self.record_success()
+        return result
@@ -0,0 +1,204 @@
+import asyncio
+import sqlite3
+from collections import deque
+from types import SimpleNamespace
+
+# Local stand-in for an aioodbc pool backed by sqlite3, so database.py (routing, pools, streaming, bulk loads) can be
+# exercised without SQL Server. Only the subset of the aioodbc interface that database.py uses is implemented.
+#
+# sqlite allows one writer at a time (a shared cache database fails parallel writers with "database table is locked"),
+# so write transactions on the same database are serialized: a connection takes the database's write lock on its first
+# write statement and frees it on commit or rollback. Parallel bulk_insert shards then run one after another. A
+# connection released with its write transaction still open is rolled back.
+#
+# A write statement run with execute outside an executemany transaction commits on its own, so a single INSERT or
+# UPDATE through run_query persists like it does against SQL Server.
+#
+# Example:
+#     primary = await create_sqlite_pool('file:primary?mode=memory&cache=shared', uri=True)
+#     register_pool(PRIMARY_POOL, primary)
+#     register_pool('replica_1', await create_sqlite_pool('file:primary?mode=memory&cache=shared', uri=True), replica=True)
+
+
+# Read statements don't open a sqlite transaction, anything else takes the write lock
+READ_STATEMENT_PREFIXES = ('SELECT', 'WITH', 'PRAGMA', 'EXPLAIN')
+
+write_locks = {}  # database: asyncio.Lock shared by every pool on that database
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor, connection: 'SQLiteConnection'):
+        self._cursor = cursor
+        self._connection = connection
+        self._impl = SimpleNamespace(fast_executemany=False)  # Mirrors the pyodbc cursor attribute database.py sets
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    async def execute(self, sql: str, *params):
+        # aioodbc accepts either execute(sql, [a, b]) or execute(sql, a, b)
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        if sql.lstrip().upper().startswith(READ_STATEMENT_PREFIXES):
+            await asyncio.to_thread(self._cursor.execute, sql, tuple(params))
+            return self
+        # Joins an open executemany transaction, otherwise runs as its own transaction
+        autocommit = not self._connection.writing
+        await self._connection.begin_write()
+        try:
+            await asyncio.to_thread(self._cursor.execute, sql, tuple(params))
+        except BaseException:
+            if autocommit:
+                await self._connection.rollback()
+            raise
+        if autocommit:
+            await self._connection.commit()
+        return self
+
+    async def executemany(self, sql: str, params: list):
+        await self._connection.begin_write()
+        await asyncio.to_thread(self._cursor.executemany, sql, [tuple(row) for row in params])
+
+    async def fetchone(self):
+        return await asyncio.to_thread(self._cursor.fetchone)
+
+    async def fetchmany(self, size: int):
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+    async def close(self):
+        self._cursor.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class SQLiteConnection:
+    def __init__(self, connection: sqlite3.Connection, write_lock: asyncio.Lock):
+        self._connection = connection
+        self._write_lock = write_lock
+        self.writing = False
+        self.closed = False
+
+    @classmethod
+    async def connect(cls, database: str, write_lock: asyncio.Lock, uri: bool = False) -> 'SQLiteConnection':
+        connection = await asyncio.to_thread(sqlite3.connect, database, uri=uri, check_same_thread=False)
+        return cls(connection, write_lock)
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor(), self)
+
+    async def begin_write(self):
+        if not self.writing:
+            await self._write_lock.acquire()
+            self.writing = True
+
+    def end_write(self):
+        if self.writing:
+            self.writing = False
+            self._write_lock.release()
+
+    async def commit(self):
+        try:
+            await asyncio.to_thread(self._connection.commit)
+        finally:
+            self.end_write()
+
+    async def rollback(self):
+        try:
+            await asyncio.to_thread(self._connection.rollback)
+        finally:
+            self.end_write()
+
+    async def close(self):
+        if not self.closed:
+            self._connection.close()
+            self.closed = True
+            self.end_write()
+
+
+class SQLitePool:
+    def __init__(self, database: str, minsize: int = 1, maxsize: int = 10, uri: bool = False):
+        self.database = database
+        self.uri = uri
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self._free = deque()
+        self._used = set()
+        self._opening = 0
+        self._condition = asyncio.Condition()
+        self._closing = False
+        self.write_lock = write_locks.setdefault(database, asyncio.Lock())
+
+    @property
+    def size(self) -> int:
+        return len(self._free) + len(self._used) + self._opening
+
+    @property
+    def freesize(self) -> int:
+        return len(self._free)
+
+    async def fill(self):
+        while self.size < self.minsize:
+            self._free.append(await self._open())
+
+    async def _open(self) -> SQLiteConnection:
+        self._opening += 1
+        try:
+            return await SQLiteConnection.connect(self.database, self.write_lock, uri=self.uri)
+        finally:
+            self._opening -= 1
+
+    async def acquire(self) -> SQLiteConnection:
+        async with self._condition:
+            while not self._free and self.size >= self.maxsize:
+                await self._condition.wait()
+            connection = self._free.popleft() if self._free else await self._open()
+            self._used.add(connection)
+            return connection
+
+    async def release(self, connection: SQLiteConnection):
+        self._used.discard(connection)
+        if connection.writing and not connection.closed:
+            await connection.rollback()
+        if not connection.closed:
+            if self._closing:
+                await connection.close()
+            else:
+                self._free.append(connection)
+        async with self._condition:
+            self._condition.notify()
+
+    def close(self):
+        self._closing = True
+
+    async def wait_closed(self):
+        while self._free:
+            await self._free.popleft().close()
+
+
+async def create_sqlite_pool(database: str, minsize: int = 1, maxsize: int = 10, uri: bool = False) -> SQLitePool:
+    """Create a sqlite backed stand-in pool and open minsize connections.
+
+    Args:
+        database (str): sqlite database path, or a file: URI with uri=True (ex: file:db?mode=memory&cache=shared).
+        minsize (optional, int): Connections to open up front. Defaults to 1.
+        maxsize (optional, int): Max concurrent connections. Defaults to 10.
+        uri (optional, bool): Whether database is a URI. Defaults to False.
+
+    Returns:
+        SQLitePool: Pool that can be passed to database.register_pool.
+    """
+    pool = SQLitePool(database, minsize=minsize, maxsize=maxsize, uri=uri)
+    await pool.fill()
+    return pool
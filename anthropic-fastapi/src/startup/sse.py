@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import asyncio
+from typing import AsyncGenerator, AsyncIterator
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+SSE_COALESCE_MS = float(os.getenv('SSE_COALESCE_MS', 20))
+SSE_COALESCE_BYTES = int(os.getenv('SSE_COALESCE_BYTES', 512))
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+# Deltas read ahead of the client. A full buffer stops reading upstream, so slow clients apply backpressure
+SSE_BUFFER_CHUNKS = int(os.getenv('SSE_BUFFER_CHUNKS', 64))
+# How often an idle stream checks whether the client is still connected
+DISCONNECT_POLL_SECONDS = 1.0
+
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+END_OF_STREAM = object()
+
+
+def format_sse(data: str, event: str = None) -> str:
+    """Frame one server-sent event. Multi line data becomes one data: field per line, as the SSE spec requires.
+
+    Args:
+        data (str): Event payload.
+        event (optional, str): Event type. Defaults to None (the client's default 'message' event).
+
+    Returns:
+        str: The framed event, ending in a blank line.
+    """
+    lines = [f'event: {event}'] if event else []
+    lines.extend(f'data: {line}' for line in data.split('\n'))
+    return '\n'.join(lines) + '\n\n'
+
+
+async def coalesce_stream(
+    source: AsyncIterator[str],
+    request: Request = None,
+    sse: bool = False,
+    max_delay_ms: float = SSE_COALESCE_MS,
+    max_bytes: int = SSE_COALESCE_BYTES,
+    heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+    buffer_chunks: int = SSE_BUFFER_CHUNKS
+) -> AsyncGenerator[str, None]:
+    """Merge small text deltas into fewer, larger writes: buffered text is flushed once it reaches max_bytes or its
+    first delta is max_delay_ms old. The source is read by a separate task through a bounded queue: a slow upstream
+    never delays a flush, and a slow client pauses the upstream read instead of piling text up in memory.
+
+    When the client disconnects the source is closed right away, cancelling the upstream call instead of leaving it
+    running until it finishes on its own.
+
+    Args:
+        source (AsyncIterator[str]): Text deltas (ex: anthropic_stream_api_call).
+        request (optional, Request): Request to watch for client disconnects. Defaults to None.
+        sse (optional, bool): Frame chunks as SSE events with heartbeats, an error event and a final done event,
+            otherwise write raw text. Defaults to False.
+        max_delay_ms (optional, float): Max time a delta waits in the buffer. Defaults to SSE_COALESCE_MS.
+        max_bytes (optional, int): Buffered size that triggers a flush. Defaults to SSE_COALESCE_BYTES.
+        heartbeat_seconds (optional, float): Idle time before an SSE heartbeat comment. Defaults to SSE_HEARTBEAT_SECONDS.
+        buffer_chunks (optional, int): Max deltas read ahead of the client. Defaults to SSE_BUFFER_CHUNKS.
+
+    Yields:
+        AsyncGenerator[str, None]: Coalesced chunks, SSE framed if sse.
+    """
+    queue = asyncio.Queue(maxsize=buffer_chunks)
+
+    async def pump():
+        try:
+            async for chunk in source:
+                await queue.put(chunk)
+            await queue.put(END_OF_STREAM)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            # Runs on cancellation too, so the upstream stream is closed as soon as the client goes away
+            if hasattr(source, 'aclose'):
+                await source.aclose()
+
+    pump_task = asyncio.create_task(pump())
+    buffer = []
+    buffered_bytes = 0
+    flush_at = None
+    last_write = time.monotonic()
+    max_delay = max_delay_ms / 1000
+
+    def flush() -> str:
+        nonlocal buffer, buffered_bytes, flush_at, last_write
+        text = ''.join(buffer)
+        buffer, buffered_bytes, flush_at, last_write = [], 0, None, time.monotonic()
+        return format_sse(text) if sse else text
+
+    try:
+        while True:
+            now = time.monotonic()
+            if flush_at is not None:
+                timeout = flush_at - now
+            elif sse:
+                timeout = min(DISCONNECT_POLL_SECONDS, last_write + heartbeat_seconds - now)
+            else:
+                timeout = DISCONNECT_POLL_SECONDS
+
+            try:
+                item = await asyncio.wait_for(queue.get(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                if flush_at is not None and time.monotonic() >= flush_at:
+                    yield flush()
+                    continue
+                if request is not None and await request.is_disconnected():
+                    return
+                if sse and time.monotonic() - last_write >= heartbeat_seconds:
+                    last_write = time.monotonic()
+                    yield ': heartbeat\n\n'
+                continue
+
+            if item is END_OF_STREAM or isinstance(item, Exception):
+                if buffer:
+                    yield flush()
+                if isinstance(item, Exception):
+                    if not sse:
+                        raise item
+                    yield format_sse(json.dumps({'error': type(item).__name__}), event='error')
+                elif sse:
+                    yield format_sse('[DONE]', event='done')
+                return
+
+            buffer.append(item)
+            buffered_bytes += len(item.encode())
+            if flush_at is None:
+                flush_at = time.monotonic() + max_delay
+            if buffered_bytes >= max_bytes or time.monotonic() >= flush_at:
+                if request is not None and await request.is_disconnected():
+                    return
+                yield flush()
+    finally:
+        pump_task.cancel()
+        try:
+            await pump_task
+        except asyncio.CancelledError:
+            pass
+
+
+def text_stream_response(source: AsyncIterator[str], request: Request = None) -> StreamingResponse:
+    """StreamingResponse writing coalesced raw text (what the vue/astro frontends read).
+    """
+    return StreamingResponse(coalesce_stream(source, request=request), media_type='text/event-stream', headers=STREAM_HEADERS)
+
+
+def sse_response(source: AsyncIterator[str], request: Request = None) -> StreamingResponse:
+    """StreamingResponse writing coalesced, SSE framed events with heartbeats.
+    """
+    return StreamingResponse(coalesce_stream(source, request=request, sse=True), media_type='text/event-stream', headers=STREAM_HEADERS)
@@ -1,9 +1,11 @@
 from src.startup.app import app
-from src.startup.throttle import limiter
+from src.startup.throttle import limiter, tiered_limit
 from fastapi import Request, Response
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from src.llm.anthropic_helpers import anthropic_stream_api_call
 from src.llm.schemas import ChatInput
+from src.startup.sse import text_stream_response, sse_response
+from src.llm import embeddings
 
 
 @app.get("/")
@@ -11,23 +13,51 @@ def read_root():
     return {"Hello": "World2"}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the embedding model has finished loading."""
+    status_code = 200 if embeddings.model_ready() else 503
+    return JSONResponse({"embedding_model": embeddings.model_state}, status_code=status_code)
+
+
 @app.get("/throttle")
-@limiter.limit("10/minute")
+@limiter.limit(tiered_limit("10/minute", "100/minute"))
 def throttle_test(request: Request):
     return {"Hello": "World2-Throttle"}
 
 
 @app.post("/stream")
-async def stream_text(input: ChatInput):
-    """FastAPI endpoint to stream AI-generated text"""
-    return StreamingResponse(anthropic_stream_api_call(input.chat_input_list), media_type="text/event-stream")
+async def stream_text(input: ChatInput, request: Request):
+    """FastAPI endpoint to stream AI-generated text (raw coalesced text, as read by the frontends)"""
+    return text_stream_response(anthropic_stream_api_call(input.chat_input_list, conversation_id=input.conversation_id), request=request)
+
+
+@app.post("/stream/sse")
+async def stream_text_sse(input: ChatInput, request: Request):
+    """FastAPI endpoint to stream AI-generated text as SSE events, with heartbeats and a final done event"""
+    return sse_response(anthropic_stream_api_call(input.chat_input_list, conversation_id=input.conversation_id), request=request)
 
 
 """ # Enable if needed for database queries
-from src.startup.database import run_query
+from src.startup.database import run_query, stream_query_response, query_cache, get_pool_metrics
 
 @app.get("/db_test/")
 async def test_db():
     result = await run_query('SELECT id FROM stg.tbl WHERE id=1')
     return result[0]
+
+
+@app.get("/db_stream_test/")
+async def test_db_stream(columnar: bool = False):
+    return await stream_query_response('SELECT id FROM stg.tbl', columnar=columnar)
+
+
+@app.get("/db_cache_stats/")
+async def db_cache_stats():
+    return query_cache.stats()
+
+
+@app.get("/db_pool_metrics/")
+async def db_pool_metrics():
+    return get_pool_metrics()
 """
@@ -1,9 +1,48 @@
+import os
+import hashlib
+from fastapi import Request
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from src.startup.app import app
+from src.startup import rate_limit_storage  # registers the sqlite:// storage scheme
 
 
-limiter = Limiter(key_func=get_remote_address)
+# memory:// counts per worker process (each of N workers allows the full limit, reset on restart). Set a shared
+# storage so every worker counts against the same limit: sqlite:////tmp/rate_limits.db for one host, or
+# redis://host:6379 for several (needs the redis package)
+RATE_LIMIT_STORAGE_URI = os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://')
+# sliding-window-counter: two counters per key, without the burst at window boundaries that fixed-window allows
+RATE_LIMIT_STRATEGY = os.getenv('RATE_LIMIT_STRATEGY', 'sliding-window-counter')
+
+
+def get_rate_limit_key(request: Request) -> str:
+    """Clients sending an X-API-Key header are limited per key (hashed so raw keys aren't stored), others per address.
+    """
+    api_key = request.headers.get('x-api-key')
+    if api_key:
+        return 'key:' + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+    return 'ip:' + get_remote_address(request)
+
+
+def tiered_limit(address_limit: str, api_key_limit: str):
+    """Limit for @limiter.limit that depends on the client, ex: @limiter.limit(tiered_limit('10/minute', '100/minute')).
+
+    Args:
+        address_limit (str): Limit for clients without an API key, counted per remote address.
+        api_key_limit (str): Limit for clients with an API key, counted per key.
+    """
+    def limit_for(key: str) -> str:
+        return api_key_limit if key.startswith('key:') else address_limit
+    return limit_for
+
+
+rate_limit_storage.check_strategy(RATE_LIMIT_STORAGE_URI, RATE_LIMIT_STRATEGY)
+limiter = Limiter(
+    key_func=get_rate_limit_key,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy=RATE_LIMIT_STRATEGY,
+    key_prefix='throttle'
+)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
\ No newline at end of file
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
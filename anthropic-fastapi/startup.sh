@@ -1,3 +1,4 @@
 #!/bin/bash
 
-gunicorn src.main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
\ No newline at end of file
+# Workers, preload and reload behaviour are set in gunicorn.conf.py (ex: WEB_CONCURRENCY=8, GUNICORN_PRELOAD=false)
+gunicorn src.main:app -c gunicorn.conf.py
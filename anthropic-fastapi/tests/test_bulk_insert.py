@@ -0,0 +1,58 @@
+import uuid
+import asyncio
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('aioodbc')
+from fastapi import HTTPException
+from src.startup import database
+from src.startup.sqlite_pool import create_sqlite_pool
+
+
+async def open_primary_pool(maxsize: int = 4):
+    # A fresh shared cache database per test, so tables and write locks don't leak between tests
+    pool = await create_sqlite_pool(f'file:{uuid.uuid4().hex}?mode=memory&cache=shared', uri=True, maxsize=maxsize)
+    database.register_pool(database.PRIMARY_POOL, pool)
+    await database.run_query('CREATE TABLE houses (id INTEGER PRIMARY KEY, price INTEGER)')
+
+
+async def count_rows() -> int:
+    return (await database.run_query('SELECT COUNT(*) AS n FROM houses'))[0]['n']
+
+
+def test_bulk_insert_of_no_rows_returns_zero_stats():
+    stats = asyncio.run(database.bulk_insert('houses', ['id', 'price'], []))
+    assert stats == {'rows': 0, 'shards': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+
+
+def test_bulk_insert_commits_every_shard():
+    async def run():
+        await open_primary_pool()
+        try:
+            stats = await database.bulk_insert('houses', ['id', 'price'], [(i, i * 10) for i in range(1000)], shards=4, batch_size=50)
+            return stats, await count_rows()
+        finally:
+            await database.close_pool()
+
+    stats, rows = asyncio.run(run())
+    assert stats['rows'] == 1000
+    assert stats['shards'] == 4
+    assert rows == 1000
+
+
+def test_failed_shard_is_rolled_back_while_the_others_commit():
+    rows = [(i, i * 10) for i in range(1000)]
+    # Duplicate key inside the first shard (rows 0-249)
+    rows[10] = (5, 0)
+
+    async def run():
+        await open_primary_pool()
+        try:
+            with pytest.raises(HTTPException) as error:
+                await database.bulk_insert('houses', ['id', 'price'], rows, shards=4, batch_size=50)
+            assert error.value.status_code == 500
+            return await count_rows()
+        finally:
+            await database.close_pool()
+
+    assert asyncio.run(run()) == 750
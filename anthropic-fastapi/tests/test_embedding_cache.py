@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from src.llm.embedding_cache import EmbeddingCache, quantize_int8, dequantize_int8
+
+
+def normalized(count: int, dim: int = 384, seed: int = 0) -> np.ndarray:
+    embeddings = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+class CountingEncoder:
+    def __init__(self, embeddings_by_text: dict):
+        self.embeddings_by_text = embeddings_by_text
+        self.encoded = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.stack([self.embeddings_by_text[text] for text in texts])
+
+
+def test_int8_quantization_round_trip():
+    embeddings = normalized(100)
+    codes, scales = quantize_int8(embeddings)
+    assert codes.dtype == np.int8
+    restored = dequantize_int8(codes, scales)
+    assert np.abs(restored - embeddings).max() <= scales.max() / 2 + 1e-7
+    # Cosine scores barely move
+    assert np.abs((restored * embeddings).sum(axis=1) - 1).max() < 1e-2
+
+
+@pytest.mark.parametrize('dtype, tolerance', [('float32', 0), ('float16', 1e-3), ('int8', 1e-2)])
+def test_cached_vectors_round_trip_through_memory_and_disk(tmp_path, dtype, tolerance):
+    texts = [f'passage: text {i}' for i in range(20)]
+    embeddings = normalized(len(texts))
+    encoder = CountingEncoder(dict(zip(texts, embeddings)))
+    path = str(tmp_path / 'embeddings.sqlite')
+
+    cache = EmbeddingCache('model', path=path, dtype=dtype)
+    cache.encode(texts, encoder)
+
+    # Repeated texts come from memory, a new cache on the same file reads them from disk, neither encodes again
+    from_memory = cache.encode(texts, encoder)
+    assert from_memory.dtype == np.float32
+    np.testing.assert_allclose(from_memory, embeddings, rtol=0, atol=tolerance)
+    restarted = EmbeddingCache('model', path=path, dtype=dtype)
+    np.testing.assert_array_equal(restarted.encode(texts, encoder), from_memory)
+    assert encoder.encoded == texts
+    assert restarted.stats()['disk_hits'] == len(texts)
+
+
+def test_only_unique_misses_are_encoded():
+    texts = ['query: a', 'query: b', 'query: c']
+    encoder = CountingEncoder(dict(zip(texts, normalized(len(texts)))))
+    cache = EmbeddingCache('model')
+    cache.encode(texts[:1], encoder)
+    result = cache.encode(['query: a', 'query: b', 'query: b', 'query: c'], encoder)
+    assert encoder.encoded == ['query: a', 'query: b', 'query: c']
+    np.testing.assert_array_equal(result[1], result[2])
+
+
+def test_model_name_is_part_of_the_key():
+    assert EmbeddingCache('model-a').make_key('text') != EmbeddingCache('model-b').make_key('text')
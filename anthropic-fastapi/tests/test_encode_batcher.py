@@ -0,0 +1,96 @@
+import time
+import asyncio
+import numpy as np
+import pytest
+from src.llm.encode_batcher import EncodeBatcher
+from src.llm.embedding_cache import EmbeddingCache
+
+
+class FakeModel:
+    """Blocking encode_fn recording every call, with one embedding row per text: [len(text), call number].
+    """
+
+    def __init__(self, fail_on: str = None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        time.sleep(0.01)
+        if self.fail_on in texts:
+            raise RuntimeError('model failed')
+        self.calls.append(list(texts))
+        return np.array([[len(text), len(self.calls)] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_callers_share_length_sorted_batches():
+    model = FakeModel()
+    batcher = EncodeBatcher(model, max_batch_size=64, max_wait_ms=20, sub_batch_size=2)
+    requests = [['ccc'], ['a', 'bbbb'], ['bb']]
+
+    async def run():
+        try:
+            return await asyncio.gather(*[batcher.encode(texts) for texts in requests])
+        finally:
+            await batcher.close()
+
+    results = asyncio.run(run())
+    # One batch, sorted by length and split into model calls of sub_batch_size texts
+    assert batcher.batches == 1
+    assert model.calls == [['a', 'bb'], ['ccc', 'bbbb']]
+    # Each caller gets its own texts' rows back, in its own order
+    for texts, result in zip(requests, results):
+        assert result[:, 0].tolist() == [len(text) for text in texts]
+
+
+def test_model_error_only_fails_callers_in_that_sub_batch():
+    batcher = EncodeBatcher(FakeModel(fail_on='bad'), max_wait_ms=20, sub_batch_size=1)
+
+    async def run():
+        try:
+            return await asyncio.gather(batcher.encode(['bad']), batcher.encode(['good']), return_exceptions=True)
+        finally:
+            await batcher.close()
+
+    failed, succeeded = asyncio.run(run())
+    assert isinstance(failed, RuntimeError)
+    assert succeeded[:, 0].tolist() == [4]
+
+
+def test_cancelled_caller_is_dropped_from_the_batch():
+    model = FakeModel()
+    batcher = EncodeBatcher(model, max_wait_ms=50)
+
+    async def run():
+        try:
+            cancelled = asyncio.ensure_future(batcher.encode(['gone']))
+            kept = asyncio.ensure_future(batcher.encode(['kept']))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            return await kept
+        finally:
+            await batcher.close()
+
+    assert asyncio.run(run())[:, 0].tolist() == [4]
+    assert model.calls == [['kept']]
+
+
+def test_cache_with_disk_tier_encodes_misses_through_the_batcher(tmp_path):
+    model = FakeModel()
+    path = str(tmp_path / 'embeddings.sqlite')
+
+    async def run(cache: EmbeddingCache, texts: list[str]) -> np.ndarray:
+        batcher = EncodeBatcher(model, max_wait_ms=1)
+        try:
+            return await cache.encode_async(texts, batcher.encode)
+        finally:
+            await batcher.close()
+
+    first = asyncio.run(run(EmbeddingCache('model', path=path), ['a', 'bb', 'a']))
+    assert model.calls == [['a', 'bb']]
+    # A restarted cache serves the same vectors from sqlite without calling the model
+    restarted = EmbeddingCache('model', path=path)
+    np.testing.assert_array_equal(asyncio.run(run(restarted, ['bb', 'a'])), first[[1, 0]])
+    assert len(model.calls) == 1
+    assert restarted.stats()['disk_hits'] == 2
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from src.startup.query_cache import QueryCache
+
+
+def counting_loader(value, delay: float = 0.01):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+    return loader, calls
+
+
+def test_concurrent_misses_share_one_load():
+    cache = QueryCache()
+    loader, calls = counting_loader([{'id': 1}])
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_load('key', loader, tags=['houses']) for _ in range(10)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == [{'id': 1}] for result in results)
+    assert cache.stats()['coalesced'] == 9
+    assert cache.get('key') == [{'id': 1}]
+
+
+def test_invalidation_during_a_load_keeps_its_result_out_of_the_cache():
+    cache = QueryCache()
+    loader, calls = counting_loader([{'id': 1}], delay=0.05)
+
+    async def run():
+        load = asyncio.ensure_future(cache.get_or_load('key', loader, tags=['houses']))
+        await asyncio.sleep(0.01)
+        # A write lands while the load may already have read the old rows
+        cache.invalidate_tags(['houses'])
+        assert await load == [{'id': 1}]
+        assert cache.get('key') is None
+        await cache.get_or_load('key', loader, tags=['houses'])
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.get('key') == [{'id': 1}]
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = QueryCache()
+    loader, calls = counting_loader([{'id': 1}], delay=0.05)
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_load('key', loader))
+        second = asyncio.ensure_future(cache.get_or_load('key', loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == [{'id': 1}]
+    assert len(calls) == 1
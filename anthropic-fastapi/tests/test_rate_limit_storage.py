@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip('limits')
+from limits import parse
+from limits.errors import ConfigurationError
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from src.startup.rate_limit_storage import SQLiteStorage, check_strategy
+from scripts.benchmark_rate_limit import run
+
+
+@pytest.fixture
+def storage_uri(tmp_path) -> str:
+    return f'sqlite:///{tmp_path / "rate_limits.db"}'
+
+
+def test_sqlite_uri_uses_the_sqlite_storage(storage_uri):
+    assert isinstance(storage_from_string(storage_uri), SQLiteStorage)
+
+
+@pytest.mark.parametrize('strategy', ['sliding-window-counter', 'fixed-window'])
+def test_limit_holds_across_processes(storage_uri, strategy):
+    # A day long window, so the test doesn't straddle a window boundary
+    result = run(storage_uri, strategy, '50/day', processes=4, attempts=40)
+    assert result['allowed'] == 50
+
+
+def test_counters_are_shared_by_separate_storage_instances(storage_uri):
+    item = parse('3/day')
+    first = STRATEGIES['sliding-window-counter'](storage_from_string(storage_uri))
+    second = STRATEGIES['sliding-window-counter'](storage_from_string(storage_uri))
+    assert [first.hit(item, 'client'), second.hit(item, 'client'), first.hit(item, 'client')] == [True, True, True]
+    assert not second.hit(item, 'client')
+    # Other keys have their own counters
+    assert second.hit(item, 'other client')
+
+
+def test_moving_window_is_rejected_up_front(storage_uri):
+    with pytest.raises(ConfigurationError):
+        check_strategy(storage_uri, 'moving-window')
+    with pytest.raises(ConfigurationError):
+        run(storage_uri, 'moving-window', '50/day', processes=2, attempts=1)
+    # Other storages are left to limits
+    check_strategy('memory://', 'moving-window')
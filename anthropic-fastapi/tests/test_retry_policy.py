@@ -0,0 +1,85 @@
+import time
+import asyncio
+import pytest
+from src.startup.retry_policy import CircuitBreaker, CircuitOpenError, PoolExhaustedError
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    # Pretend reset_timeout has already passed, so the next call is the half open trial
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+
+def test_cancelled_trial_call_frees_the_trial_slot():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_breaker(breaker)
+
+    async def run():
+        trial = asyncio.ensure_future(breaker.call(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        assert breaker.trial_in_flight
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert not breaker.trial_in_flight
+        assert breaker.state == 'half_open'
+        # The next call becomes the new trial and closes the breaker on success
+        assert await breaker.call(asyncio.sleep, 0, 'ok') == 'ok'
+
+    asyncio.run(run())
+    assert breaker.state == 'closed'
+
+
+def test_concurrent_call_is_rejected_while_trial_runs():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    open_breaker(breaker)
+
+    async def run():
+        trial = asyncio.ensure_future(breaker.call(asyncio.sleep, 0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(asyncio.sleep, 0)
+        await trial
+
+    asyncio.run(run())
+    assert breaker.state == 'closed'
+
+
+def test_pool_exhaustion_is_not_counted_as_a_server_failure():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    async def exhausted():
+        raise PoolExhaustedError('pool saturated')
+
+    async def run():
+        for _ in range(5):
+            with pytest.raises(PoolExhaustedError):
+                await breaker.call(exhausted)
+
+    asyncio.run(run())
+    assert breaker.state == 'closed'
+    assert breaker.consecutive_failures == 0
+
+
+def test_cancelled_non_trial_call_keeps_the_running_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+
+    async def run():
+        # Started while closed, so it isn't the trial
+        slow = asyncio.ensure_future(breaker.call(asyncio.sleep, 10))
+        await asyncio.sleep(0)
+        open_breaker(breaker)
+        trial = asyncio.ensure_future(breaker.call(asyncio.sleep, 0.05))
+        await asyncio.sleep(0)
+        assert breaker.trial_in_flight
+        slow.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+        assert breaker.trial_in_flight
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(asyncio.sleep, 0)
+        await trial
+
+    asyncio.run(run())
+    assert breaker.state == 'closed'
@@ -1,14 +1,15 @@
 # Flask Library Imports
 from flask import request, json
 from flask_restful import Resource
+from marshmallow import ValidationError
 
 # Local object imports
 from Starter.app import api
-from Schemas.request_schemas import request_input_schema_multiple
+from Schemas.request_schemas import request_input_schema_multiple, request_input_schema_columnar
 from Schemas.response_schemas import response_schema_multiple
 
 # ML Logic
-from API.housing_clustering import cluster_houses
+from API.housing_clustering import cluster_houses, cluster_houses_columnar
 
 
 def parse_request(request):
@@ -29,8 +30,18 @@ class HousingClustering(Resource):
     def post(self):
 
         try:
-            # Parse request into json and validate schema
+            # Parse request into json
             json_data = parse_request(request)
+
+            # Columnar input (one list per field) is validated per column and returned as columns
+            if isinstance(json_data, dict):
+                try:
+                    features = request_input_schema_columnar.load(json_data)
+                except ValidationError as err:
+                    return str(err.messages), 400
+                return json.dumps(cluster_houses_columnar(features)), 200
+
+            # Row input (one dict per house), validate schema
             errors = request_input_schema_multiple.validate(json_data)
 
             # If errors exist abort and send to api caller
@@ -1,6 +1,68 @@
-from sklearn.cluster import KMeans
+import os
+import sys
+import threading
+from sklearn.cluster import KMeans, MiniBatchKMeans
+import joblib
 import numpy as np
-import pandas as pd
+
+FEATURE_COLUMNS = ['square_footage', 'number_of_rooms', 'price']
+
+# Pre-fitted model (see fit_model) loaded once and reused, instead of fitting a new KMeans on every request
+HOUSING_MODEL_PATH = os.getenv('HOUSING_MODEL_PATH')
+# Update a MiniBatchKMeans model with every request's houses before predicting
+HOUSING_MODEL_UPDATE = os.getenv('HOUSING_MODEL_UPDATE', 'false').lower() == 'true'
+
+model = None
+model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the pre-fitted model from HOUSING_MODEL_PATH on first use
+
+    Returns:
+        Fitted estimator with a predict method, or None if HOUSING_MODEL_PATH isn't set
+    """
+    global model
+    if model is None and HOUSING_MODEL_PATH:
+        with model_lock:
+            if model is None:
+                model = joblib.load(HOUSING_MODEL_PATH)
+    return model
+
+
+def rows_to_features(input_data):
+    """Convert row format request data into a feature matrix
+
+    Args:
+        input_data (list): list of dicts, one per house
+
+    Returns:
+        np.ndarray: float matrix with one row per house, columns in FEATURE_COLUMNS order
+    """
+    return np.array([[house[column] for column in FEATURE_COLUMNS] for house in input_data], dtype=np.float64)
+
+
+def assign_clusters(features):
+    """Cluster group per house: predicted by the pre-fitted model if one is configured, otherwise from a KMeans fit
+    on just these houses
+
+    Args:
+        features (np.ndarray): feature matrix from rows_to_features or the columnar request schema
+
+    Returns:
+        np.ndarray: cluster group per row
+    """
+    current_model = get_model()
+    if current_model is None:
+        return KMeans(n_clusters=3, random_state=42).fit(features).labels_
+
+    if HOUSING_MODEL_UPDATE:
+        # partial_fit changes the centers in place, so predict on the same centers it just produced
+        with model_lock:
+            current_model.partial_fit(features)
+            return current_model.predict(features)
+    return current_model.predict(features)
+
 
 def cluster_houses(input_data):
     """Cluster housing data using KMeans
@@ -11,6 +73,44 @@ def cluster_houses(input_data):
     Returns:
         list: list of dict objects containing row and cluster group
     """
-    data = pd.DataFrame.from_dict(input_data).to_numpy()
-    kmeans = KMeans(n_clusters=3, random_state=42).fit(data)
-    return [{'row': (i+1), 'group': label} for i, label in enumerate(kmeans.labels_)]
\ No newline at end of file
+    labels = assign_clusters(rows_to_features(input_data))
+    return [{'row': (i+1), 'group': label} for i, label in enumerate(labels.tolist())]
+
+
+def cluster_houses_columnar(features):
+    """Cluster housing data sent in columnar format
+
+    Args:
+        features (np.ndarray): feature matrix loaded by the columnar request schema
+
+    Returns:
+        dict: row and group columns, ex: {'row': [1, 2], 'group': [0, 2]}
+    """
+    labels = assign_clusters(features)
+    return {'row': list(range(1, len(labels) + 1)), 'group': labels.tolist()}
+
+
+def fit_model(features, path, n_clusters=3, batch_size=4096):
+    """Fit a MiniBatchKMeans model and save it for HOUSING_MODEL_PATH
+
+    Args:
+        features (np.ndarray): feature matrix, columns in FEATURE_COLUMNS order
+        path (str): joblib file to save the model to
+        n_clusters (int): number of cluster groups
+        batch_size (int): houses per mini batch
+
+    Returns:
+        MiniBatchKMeans: fitted model
+    """
+    fitted_model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=42, n_init=3).fit(features)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump(fitted_model, path)
+    return fitted_model
+
+
+if __name__ == '__main__':
+    # Fit from a csv with FEATURE_COLUMNS headers, ex: python -m API.housing_clustering ../pbi/test_data.csv models/housing_kmeans.joblib
+    csv_path, model_path = sys.argv[1], sys.argv[2]
+    training_features = np.genfromtxt(csv_path, delimiter=',', names=True, usecols=FEATURE_COLUMNS)
+    fit_model(np.column_stack([training_features[column] for column in FEATURE_COLUMNS]).astype(np.float64), model_path)
+    print(f'Saved model to {model_path}')
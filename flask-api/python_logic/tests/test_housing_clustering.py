@@ -0,0 +1,44 @@
+# Run from the python_logic directory, like the app: python -m pytest tests
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('sklearn')
+marshmallow = pytest.importorskip('marshmallow')
+
+from API import housing_clustering
+from Schemas.request_schemas import request_input_schema_columnar
+
+
+def make_houses(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'square_footage': rng.integers(500, 5000, count).tolist(),
+        'number_of_rooms': rng.integers(1, 8, count).tolist(),
+        'price': rng.integers(50000, 900000, count).tolist()
+    }
+
+
+def test_columnar_request_round_trips_through_a_saved_model(tmp_path, monkeypatch):
+    houses = make_houses()
+    features = request_input_schema_columnar.load(houses)
+    model_path = str(tmp_path / 'housing_kmeans.joblib')
+    fitted_model = housing_clustering.fit_model(features, model_path)
+
+    monkeypatch.setattr(housing_clustering, 'HOUSING_MODEL_PATH', model_path)
+    monkeypatch.setattr(housing_clustering, 'model', None)
+    result = housing_clustering.cluster_houses_columnar(request_input_schema_columnar.load(houses))
+
+    assert result['row'] == list(range(1, len(features) + 1))
+    assert result['group'] == fitted_model.predict(features).tolist()
+    # The row format gives the same groups for the same houses
+    rows = [dict(zip(housing_clustering.FEATURE_COLUMNS, house)) for house in zip(*(houses[column] for column in housing_clustering.FEATURE_COLUMNS))]
+    assert [house['group'] for house in housing_clustering.cluster_houses(rows)] == result['group']
+
+
+@pytest.mark.parametrize('column', [[[1, 2], [3]], [1, True, 3], [True, False], [1.5, 2], [], 'abc'])
+def test_columnar_request_rejects_invalid_columns(column):
+    houses = make_houses(count=3)
+    houses['price'] = column
+    with pytest.raises(marshmallow.ValidationError) as error:
+        request_input_schema_columnar.load(houses)
+    assert error.value.messages == {'price': ['Must be a non-empty list of integers.']}
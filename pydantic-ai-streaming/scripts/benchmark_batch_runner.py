@@ -0,0 +1,114 @@
+"""Throughput benchmark for BatchRunner against an in-process fake Messages API (httpx.MockTransport) that simulates
+latency and throttling (429 with retry-after past a requests/min limit, random 529 overloaded errors).
+
+Run from the pydantic-ai-streaming directory:
+
+    python -m scripts.benchmark_batch_runner --prompts 200 --concurrency 16
+"""
+import os
+os.environ.setdefault('RESPONSE_CACHE_TTL', '0')  # every prompt must reach the fake server
+
+import time
+import json
+import random
+import asyncio
+import argparse
+import httpx
+from anthropic import AsyncAnthropic
+from src import anthropic_client
+from src.base_stream_example import anthropic_full_api_call
+from src.batch_runner import BatchRunner
+
+
+class FakeMessagesAPI:
+    def __init__(self, latency_ms: float, server_rpm: float, overload_rate: float):
+        self.latency = latency_ms / 1000
+        self.server_rpm = server_rpm
+        self.overload_rate = overload_rate
+        self.window = []
+        self.requests = 0
+        self.throttled = 0
+        self.overloaded = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        now = time.monotonic()
+        self.window = [t for t in self.window if now - t < 60]
+        if len(self.window) >= self.server_rpm:
+            self.throttled += 1
+            retry_after = 60 - (now - self.window[0])
+            return httpx.Response(429, headers={'retry-after': f'{retry_after:.3f}'}, json={'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'rate limited'}})
+        self.window.append(now)
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.overload_rate:
+            self.overloaded += 1
+            return httpx.Response(529, json={'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'overloaded'}})
+        body = json.loads(request.content)
+        return httpx.Response(200, json={
+            'id': 'msg_fake', 'type': 'message', 'role': 'assistant', 'model': body['model'],
+            'content': [{'type': 'text', 'text': 'ok ' + body['messages'][-1]['content'][0]['text']}],
+            'stop_reason': 'end_turn', 'stop_sequence': None, 'usage': {'input_tokens': 10, 'output_tokens': 2}
+        })
+
+
+def install_fake_client(api: FakeMessagesAPI):
+    """Point the shared client at the fake API, with SDK retries off so the runner owns them.
+    """
+    anthropic_client.clients[asyncio.get_running_loop()] = AsyncAnthropic(
+        api_key='fake', max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+    )
+
+
+async def benchmark(args) -> None:
+    chat_inputs = [[{'role': 'user', 'message': f'prompt {i}'}] for i in range(args.prompts)]
+
+    if args.sequential:
+        api = FakeMessagesAPI(args.latency_ms, args.server_rpm, overload_rate=0)
+        install_fake_client(api)
+        start = time.perf_counter()
+        for chat_input_list in chat_inputs[:args.sequential]:
+            await anthropic_full_api_call(chat_input_list=chat_input_list, system_prompt='sys')
+        elapsed = time.perf_counter() - start
+        print(f'sequential loop: {args.sequential} prompts in {elapsed:.2f}s ({args.sequential / elapsed:.1f} prompts/s)')
+
+    api = FakeMessagesAPI(args.latency_ms, args.server_rpm, args.overload_rate)
+    install_fake_client(api)
+    runner = BatchRunner(
+        concurrency=args.concurrency,
+        requests_per_minute=args.client_rpm,
+        tokens_per_minute=args.client_tpm,
+        base_delay=0.05,
+        max_delay=2
+    )
+    start = time.perf_counter()
+    first_result_s = None
+    latencies = []
+    failed = 0
+    async for result in runner.run_as_completed(chat_inputs, system_prompt='sys'):
+        first_result_s = first_result_s or time.perf_counter() - start
+        latencies.append(result['latency_ms'])
+        failed += result['error'] is not None
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f'batch runner: {args.prompts} prompts in {elapsed:.2f}s ({args.prompts / elapsed:.1f} prompts/s), '
+        f'first result {first_result_s * 1000:.0f}ms, p50 {latencies[len(latencies) // 2]:.0f}ms, '
+        f'p99 {latencies[int(len(latencies) * 0.99) - 1]:.0f}ms, failed {failed}'
+    )
+    print(f'server: {api.requests} requests, {api.throttled} throttled (429), {api.overloaded} overloaded (529); runner retries {runner.retries}')
+
+    ordered = await BatchRunner(concurrency=args.concurrency, requests_per_minute=1e9, tokens_per_minute=1e9, base_delay=0.05).run(chat_inputs[:20], system_prompt='sys')
+    assert [result['index'] for result in ordered] == list(range(len(ordered)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--prompts', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--server-rpm', type=float, default=6000, help='Fake server limit before returning 429')
+    parser.add_argument('--overload-rate', type=float, default=0.02, help='Share of requests answered with 529')
+    parser.add_argument('--client-rpm', type=float, default=12000, help='BatchRunner requests/min budget')
+    parser.add_argument('--client-tpm', type=float, default=1e7, help='BatchRunner tokens/min budget')
+    parser.add_argument('--sequential', type=int, default=20, help='Prompts to time with a plain one at a time loop (0 to skip)')
+    asyncio.run(benchmark(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""Per event overhead of the stream event handling, before (parse_event + StreamEvent validation + eager debug
+formatting into a list) and after (display_content dispatch + lazy debug messages in a ring buffer).
+
+Replays a recorded-style event stream (a text response streamed as many small deltas, plus a tool call), so no API
+key is needed. Run from the pydantic-ai-streaming directory:
+
+    python -m scripts.benchmark_parse_event --deltas 2000 --repeat 20
+"""
+import time
+import asyncio
+import argparse
+from collections import deque
+from pydantic_ai.messages import FinalResultEvent, PartDeltaEvent, PartStartEvent, TextPart, TextPartDelta, ToolCallPart, ToolCallPartDelta
+from src.pydantic_stream_example import parse_event, handle_stream_events
+
+
+def recorded_events(deltas: int) -> list:
+    events = [
+        PartStartEvent(index=0, part=ToolCallPart(tool_name='get_weather', args='', tool_call_id='call_1')),
+        PartDeltaEvent(index=0, delta=ToolCallPartDelta(args_delta='{"city": "Paris"}', tool_call_id='call_1')),
+        PartStartEvent(index=1, part=TextPart(content='The'))
+    ]
+    events.extend(PartDeltaEvent(index=1, delta=TextPartDelta(content_delta=f' token{i}')) for i in range(deltas))
+    events.append(FinalResultEvent(tool_name=None, tool_call_id=None))
+    return events
+
+
+async def replay(events: list):
+    for event in events:
+        yield event
+
+
+async def before(events: list) -> int:
+    """Original handle_stream_events: a validated StreamEvent and eager debug string per event.
+    """
+    debug_messages = []
+    displayed = 0
+    async for event in replay(events):
+        parsed_event = parse_event(event)
+        if parsed_event.is_display():
+            displayed += len(parsed_event.content)
+        else:
+            debug_messages.append(parsed_event.content)
+    return displayed
+
+
+async def after(events: list, debug: bool) -> int:
+    debug_messages = deque(maxlen=500 if debug else 0)
+    displayed = 0
+    async for content in handle_stream_events(replay(events), debug_messages):
+        displayed += len(content)
+    return displayed
+
+
+async def time_per_event(run, events: list, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run(events)
+        best = min(best, time.perf_counter() - start)
+    return best / len(events) * 1e6
+
+
+async def main(args):
+    events = recorded_events(args.deltas)
+    assert await before(events) == await after(events, debug=True) == await after(events, debug=False)
+    results = {
+        'before (parse_event)': await time_per_event(before, events, args.repeat),
+        'after, debug on': await time_per_event(lambda e: after(e, debug=True), events, args.repeat),
+        'after, debug off': await time_per_event(lambda e: after(e, debug=False), events, args.repeat)
+    }
+    print(f'{len(events)} events, best of {args.repeat}')
+    for name, microseconds in results.items():
+        print(f'{name:<22}{microseconds:>8.2f} us/event')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--deltas', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
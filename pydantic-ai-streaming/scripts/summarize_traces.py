@@ -0,0 +1,35 @@
+"""Summarize a trace file written by src/tracing.py (TRACE_PATH, jsonl or otel format): count, total and percentile
+durations per span name, so the tools and model calls that dominate latency stand out.
+
+    python -m scripts.summarize_traces traces.jsonl
+"""
+import json
+import argparse
+from collections import defaultdict
+
+
+def span_name_and_duration(record: dict) -> tuple[str, float]:
+    if 'duration_ms' in record:
+        return record['name'], record['duration_ms']
+    return record['name'], (int(record['endTimeUnixNano']) - int(record['startTimeUnixNano'])) / 1e6
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    durations = defaultdict(list)
+    with open(args.path) as f:
+        for line in f:
+            name, duration_ms = span_name_and_duration(json.loads(line))
+            durations[name].append(duration_ms)
+
+    print(f"{'span':<32}{'count':>8}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        print(f'{name:<32}{len(values):>8}{sum(values):>12.1f}{percentile(values, 0.5):>10.1f}{percentile(values, 0.95):>10.1f}{values[-1]:>10.1f}')
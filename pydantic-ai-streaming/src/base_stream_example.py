@@ -1,8 +1,20 @@
 import os
 from typing import AsyncGenerator
-from anthropic import AsyncAnthropic
+from src.anthropic_client import get_client, model_slot
+from src.response_cache import ResponseCache, make_request_key
 
-ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
+STREAM_MODEL = "claude-3-5-sonnet-20241022"
+FULL_MODEL = "claude-3-5-haiku-20241022"
+STREAM_SYSTEM_PROMPT = 'You are a helpful assistant that can answer questions and help with tasks.'
+
+# Response caching is opt in, since replaying a sampled (temperature > 0) reply is only right for repeatable jobs
+# (ex: batch runs): set RESPONSE_CACHE_TTL, or pass cache_ttl per call. RESPONSE_CACHE_PATH adds the on-disk tier
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 0))
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+    default_ttl=RESPONSE_CACHE_TTL or 3600,
+    path=os.getenv('RESPONSE_CACHE_PATH')
+)
 
 
 def build_anthropic_message_input(chat_input_list: list) -> list:
@@ -28,11 +40,14 @@ def build_anthropic_message_input(chat_input_list: list) -> list:
     return message_input
 
 
-async def anthropic_stream_api_call(chat_input_list: list) -> AsyncGenerator[str, None]:
-    """Streams anthropic response.
+async def anthropic_stream_api_call(chat_input_list: list, bypass_cache: bool = False, cache_ttl: float = None) -> AsyncGenerator[str, None]:
+    """Streams anthropic response. With caching on, identical requests are replayed from the response cache, and
+    concurrent identical requests share one upstream stream.
 
     Args:
         chat_input_list (list): List of chat inputs to send to the API.
+        bypass_cache (optional, bool): Always stream from the API, refreshing the cached response. Defaults to False.
+        cache_ttl (optional, float): Seconds to cache the response, 0 for no caching. Defaults to RESPONSE_CACHE_TTL env var, or 0.
 
     Yields:
         AsyncGenerator[str, None]: Stream of anthropic response.
@@ -40,49 +55,70 @@ async def anthropic_stream_api_call(chat_input_list: list) -> AsyncGenerator[str
 
     # Build message list
     message_input = build_anthropic_message_input(chat_input_list=chat_input_list)
+    request = {
+        'model': STREAM_MODEL,
+        'max_tokens': 4096,
+        'temperature': 0.2,
+        'system': STREAM_SYSTEM_PROMPT,
+        'messages': message_input
+    }
+
+    async def upstream_stream() -> AsyncGenerator[str, None]:
+        # Make api call on the shared client, holding a model slot for the whole stream
+        async with model_slot(STREAM_MODEL):
+            stream = await get_client().messages.create(**request, stream=True)
+
+            # Close the upstream HTTP response as soon as the consumer stops (ex: client disconnect)
+            async with stream:
+                async for event in stream:
+                    if event.type in ['message_start', 'message_delta', 'message_stop', 'content_block_start', 'content_block_stop']:
+                        pass
+                    elif event.type == 'content_block_delta':
+                        yield event.delta.text
+                    else:
+                        yield event.type
+
+    cache_ttl = RESPONSE_CACHE_TTL if cache_ttl is None else cache_ttl
+    if cache_ttl <= 0:
+        stream = upstream_stream()
+    else:
+        stream = response_cache.stream(make_request_key(**request), upstream_stream, ttl=cache_ttl, bypass=bypass_cache)
+    async for chunk in stream:
+        yield chunk
+
 
-    # Setup and make api call.
-    client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-    stream = await client.messages.create(
-        model="claude-3-5-sonnet-20241022",
-        max_tokens=4096,
-        temperature=0.2,
-        system='You are a helpful assistant that can answer questions and help with tasks.',
-        messages=message_input,
-        stream=True
-    )
-
-    async for event in stream:
-        if event.type in ['message_start', 'message_delta', 'message_stop', 'content_block_start', 'content_block_stop']:
-            pass
-        elif event.type == 'content_block_delta':
-            yield event.delta.text
-        else:
-            yield event.type
-
-
-async def anthropic_full_api_call(chat_input_list: list, system_prompt: str) -> str:
+async def anthropic_full_api_call(chat_input_list: list, system_prompt: str, bypass_cache: bool = False, cache_ttl: float = None) -> str:
     """
     Makes a non-streaming call to the Anthropic API and returns the full response.
+    With caching on, identical requests are served from the response cache, and concurrent identical requests share one API call.
     
     Args:
         chat_input_list (list): List of chat inputs containing role and message
         system_prompt (str): System prompt to use for the API call
+        bypass_cache (optional, bool): Always call the API, refreshing the cached response. Defaults to False.
+        cache_ttl (optional, float): Seconds to cache the response, 0 for no caching. Defaults to RESPONSE_CACHE_TTL env var, or 0.
     
     Returns:
         str: Complete response from the API
     """
     message_input = build_anthropic_message_input(chat_input_list)
-    
-    client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-    message = await client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=4096,
-        temperature=0.2,
-        system=system_prompt,
-        messages=message_input
-    )
-
-    # Extract and return the full response text
-    output_text = message.content[0].text
-    return str(output_text)
\ No newline at end of file
+    request = {
+        'model': FULL_MODEL,
+        'max_tokens': 4096,
+        'temperature': 0.2,
+        'system': system_prompt,
+        'messages': message_input
+    }
+
+    async def upstream_call() -> str:
+        async with model_slot(FULL_MODEL):
+            message = await get_client().messages.create(**request)
+
+        # Extract and return the full response text
+        output_text = message.content[0].text
+        return str(output_text)
+
+    cache_ttl = RESPONSE_CACHE_TTL if cache_ttl is None else cache_ttl
+    if cache_ttl <= 0:
+        return await upstream_call()
+    return await response_cache.get_or_load(make_request_key(**request), upstream_call, ttl=cache_ttl, bypass=bypass_cache)
\ No newline at end of file
@@ -0,0 +1,209 @@
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, Iterable
+from src.base_stream_example import anthropic_full_api_call
+
+# 429 rate limited, 529 overloaded
+RETRYABLE_STATUS_CODES = {429, 529}
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at rate_per_minute, holding at most one minute of budget.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        """
+        Args:
+            rate_per_minute (float): Sustained budget per minute (requests or tokens).
+            capacity (optional, float): Max burst. Defaults to rate_per_minute.
+        """
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until amount is available, then take it. Requests larger than capacity are clamped to capacity.
+        """
+        amount = min(amount, self.capacity)
+        # Lock keeps waiters first come first served, so large requests aren't starved by small ones
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+
+
+def estimate_tokens(chat_input_list: list, system_prompt: str = '') -> int:
+    """Rough input token count (~4 characters per token) used for tokens/min budgeting.
+    """
+    characters = len(system_prompt or '') + sum(len(str(chat_instance.get('message', ''))) for chat_instance in chat_input_list)
+    return characters // 4 + 1
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Read the server requested wait from a retry-after-ms or retry-after header (seconds or HTTP date).
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms') is not None:
+            return float(headers['retry-after-ms']) / 1000
+        retry_after = headers.get('retry-after')
+        if retry_after is None:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limited (429) and overloaded (529) API errors.
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status_code in RETRYABLE_STATUS_CODES
+
+
+class BatchRunner:
+    """Runs many prompts through anthropic_full_api_call (or another call_fn with the same signature) with bounded
+    concurrency, requests/min and tokens/min budgets, and retries on 429/529 honoring retry-after.
+
+    A retry-after from any call pauses every worker, since the rate limit applies to the whole API key.
+    """
+
+    def __init__(
+        self,
+        call_fn=anthropic_full_api_call,
+        concurrency: int = 8,
+        requests_per_minute: float = 50,
+        tokens_per_minute: float = 40000,
+        max_retries: int = 5,
+        base_delay: float = 1,
+        max_delay: float = 60
+    ):
+        """
+        Args:
+            call_fn (optional): Coroutine function taking chat_input_list and system_prompt. Defaults to anthropic_full_api_call.
+            concurrency (optional, int): Max calls in flight. Defaults to 8.
+            requests_per_minute (optional, float): Request budget. Defaults to 50.
+            tokens_per_minute (optional, float): Estimated input token budget. Defaults to 40000.
+            max_retries (optional, int): Retries per prompt on 429/529. Defaults to 5.
+            base_delay (optional, float): First backoff in seconds when no retry-after is given. Defaults to 1.
+            max_delay (optional, float): Backoff cap in seconds. Defaults to 60.
+        """
+        self.call_fn = call_fn
+        self.concurrency = concurrency
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._resume_at = 0.0
+        self.retries = 0
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after
+        # Full jitter so throttled workers don't all retry at the same moment
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _call(self, chat_input_list: list, system_prompt: str, call_kwargs: dict):
+        tokens = estimate_tokens(chat_input_list, system_prompt)
+        attempt = 0
+        while True:
+            pause = self._resume_at - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(tokens)
+            try:
+                return await self.call_fn(chat_input_list=chat_input_list, system_prompt=system_prompt, **call_kwargs), attempt + 1
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                if retry_after_seconds(e) is not None:
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def run_as_completed(self, chat_inputs: Iterable[list], system_prompt: str, **call_kwargs) -> AsyncGenerator[dict, None]:
+        """Run every chat input, yielding each result as soon as it completes.
+
+        chat_inputs is consumed lazily, so it can be a generator over a large file.
+
+        Args:
+            chat_inputs (Iterable[list]): chat_input_list per prompt.
+            system_prompt (str): System prompt shared by every prompt.
+            **call_kwargs: Extra keyword arguments for call_fn (ex: bypass_cache=True).
+
+        Yields:
+            AsyncGenerator[dict, None]: {'index', 'result', 'error', 'attempts', 'latency_ms'} per prompt, in completion order.
+        """
+        inputs = enumerate(chat_inputs)
+        results = asyncio.Queue()
+
+        async def worker():
+            for index, chat_input_list in inputs:
+                start = time.perf_counter()
+                try:
+                    result, attempts = await self._call(chat_input_list, system_prompt, call_kwargs)
+                    error = None
+                except Exception as e:
+                    result, attempts, error = None, None, e
+                await results.put({
+                    'index': index,
+                    'result': result,
+                    'error': error,
+                    'attempts': attempts,
+                    'latency_ms': (time.perf_counter() - start) * 1000
+                })
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        all_done = asyncio.ensure_future(asyncio.gather(*workers))
+        try:
+            while not (all_done.done() and results.empty()):
+                get_result = asyncio.ensure_future(results.get())
+                await asyncio.wait([get_result, all_done], return_when=asyncio.FIRST_COMPLETED)
+                if get_result.done():
+                    yield get_result.result()
+                else:
+                    get_result.cancel()
+            # Surface unexpected worker failures (call errors are captured per prompt above)
+            all_done.result()
+        finally:
+            # Consumer stopped early (break/aclose): stop the workers so no more calls are made
+            all_done.cancel()
+            await asyncio.gather(all_done, *workers, return_exceptions=True)
+
+    async def run(self, chat_inputs: Iterable[list], system_prompt: str, **call_kwargs) -> list[dict]:
+        """Run every chat input and return the results in input order.
+
+        Args:
+            chat_inputs (Iterable[list]): chat_input_list per prompt.
+            system_prompt (str): System prompt shared by every prompt.
+            **call_kwargs: Extra keyword arguments for call_fn.
+
+        Returns:
+            list[dict]: One result dict per prompt (see run_as_completed), in input order.
+        """
+        results = [result async for result in self.run_as_completed(chat_inputs, system_prompt, **call_kwargs)]
+        return sorted(results, key=lambda result: result['index'])
@@ -13,6 +13,12 @@ from pydantic_ai.messages import (
 from pydantic import BaseModel
 from enum import Enum
 from typing import AsyncIterator
+from contextlib import aclosing
+from collections import deque
+from src.tracing import Tracer, RunTrace, get_tracer
+
+# Most recent debug messages kept per stream
+DEBUG_BUFFER_SIZE = 500
 
 
 class EventType(str, Enum):
@@ -96,69 +102,163 @@ def parse_event(event: AgentStreamEvent) -> StreamEvent:
         )
 
 
-async def handle_stream_events(stream: AsyncIterator[AgentStreamEvent], debug_messages: list[str]) -> AsyncIterator[str]:
+def display_part_start(event: PartStartEvent) -> str | None:
+    return event.part.content if hasattr(event.part, 'content') else None
+
+
+def display_part_delta(event: PartDeltaEvent) -> str | None:
+    return event.delta.content_delta if isinstance(event.delta, TextPartDelta) else None
+
+
+# Event class -> function returning display content, or None for debug only events
+DISPLAY_HANDLERS = {
+    PartStartEvent: display_part_start,
+    PartDeltaEvent: display_part_delta
+}
+DEBUG_EVENT_TYPES = (PartStartEvent, PartDeltaEvent, FinalResultEvent, FunctionToolCallEvent, FunctionToolResultEvent)
+
+
+def display_content(event: AgentStreamEvent) -> str | None:
+    """
+    Fast path equivalent of parse_event: one dict lookup per event and a plain string for display events, with no
+    StreamEvent validation or debug formatting.
+
+    Args:
+        event (AgentStreamEvent): The event to parse.
+
+    Returns:
+        str | None: Display content, or None when the event is debug only.
+    """
+    handler = DISPLAY_HANDLERS.get(type(event))
+    return handler(event) if handler is not None else None
+
+
+class DebugMessage:
+    """
+    Debug message for an event, formatted only when read (ex: printed at the end of the stream).
+    """
+    __slots__ = ('event',)
+
+    def __init__(self, event: AgentStreamEvent):
+        self.event = event
+
+    def __str__(self) -> str:
+        prefix = '' if isinstance(self.event, DEBUG_EVENT_TYPES) else 'UNKNOWN '
+        return f'{prefix}{type(self.event)}: {self.event}'
+
+
+def trace_tool_event(trace: RunTrace, event: AgentStreamEvent):
+    """
+    Open/close tool call spans from tool call and tool result events.
+    """
+    if isinstance(event, FunctionToolCallEvent):
+        trace.tool_call_started(event.part.tool_name, event.part.tool_call_id)
+    elif isinstance(event, FunctionToolResultEvent):
+        trace.tool_call_finished(event.tool_call_id)
+
+
+async def handle_stream_events(stream: AsyncIterator[AgentStreamEvent], debug_messages: deque | None, trace: RunTrace = None) -> AsyncIterator[str]:
     """
     Process stream events and handle display/debug routing.
     
     Args:
         stream: The event stream to process, yields AgentStreamEvent objects.
-        debug_messages: List to collect debug messages. Modified in place.
+        debug_messages: Bounded deque to collect debug messages, modified in place. None (or maxlen 0) skips collection.
+        trace: Run trace to record tool call spans on. Defaults to None.
         
     Yields:
         str: Content from display events
     """
+    collect_debug = debug_messages is not None and debug_messages.maxlen != 0
     async for event in stream:
-        parsed_event = parse_event(event)
-        if parsed_event.is_display():
-            yield parsed_event.content
-        else:
-            debug_messages.append(parsed_event.content)
+        content = display_content(event)
+        if content is not None:
+            yield content
+            continue
+        if trace is not None:
+            trace_tool_event(trace, event)
+        if collect_debug:
+            debug_messages.append(DebugMessage(event))
 
 
-async def main_stream(agent: Agent, user_prompt: str) -> AsyncIterator[str]:
+async def main_stream(
+    agent: Agent,
+    user_prompt: str,
+    debug: bool = True,
+    debug_buffer_size: int = DEBUG_BUFFER_SIZE,
+    tracer: Tracer = None
+) -> AsyncIterator[str]:
     """
     Main function to handle the streaming of events from the agent based on the user prompt.
 
     This function manages the streaming of different types of nodes (user prompt, model request, tool calls, etc.)
     and processes the events generated during the stream. It yields the content of display events and collects
-    debug messages for other types of events.
+    debug messages for other types of events. Each run is traced: spans for the run, every node and every tool call,
+    with time to first token and token counts (see src/tracing.py, TRACE_PATH exports them to a file).
 
     Args:
         agent (Agent): The agent responsible for handling the user prompt and generating events.
         user_prompt (str): The user prompt to be processed by the agent.
+        debug (optional, bool): Collect and print debug messages. Defaults to True.
+        debug_buffer_size (optional, int): Number of most recent debug messages kept. Defaults to DEBUG_BUFFER_SIZE.
+        tracer (optional, Tracer): Tracer to record spans with. Defaults to the shared tracer (get_tracer).
 
     Yields:
         str: The content of display events generated during the stream.
 
     Collects:
-        list: A list of debug messages generated during the stream and prints at the end.
+        deque: The most recent debug messages generated during the stream and prints at the end.
     """
-    debug_messages = []
+    debug_messages = deque(maxlen=debug_buffer_size if debug else 0)
     content_streamed = False
-    async with agent.iter(user_prompt) as run:
-        async for node in run:
-            if Agent.is_user_prompt_node(node):
-                debug_messages.append(f'UserPromptNode: {node.user_prompt}')
-            elif Agent.is_model_request_node(node):
-                debug_messages.append(f'ModelRequestNode: streaming partial request tokens')
-                async with node.stream(run.ctx) as request_stream:
-                    async for content in handle_stream_events(request_stream, debug_messages):
-                        if content:
-                            content_streamed = True
-                            yield content
-            elif Agent.is_call_tools_node(node):
-                debug_messages.append(f'ToolCallNode: streaming tool calls and results (debug only)')
-                async with node.stream(run.ctx) as tool_request_stream:
-                    async for _ in handle_stream_events(tool_request_stream, debug_messages):
-                        pass
-            elif Agent.is_end_node(node):
-                if content_streamed:
-                    debug_messages.append(f'end_node: {run.result.data}')
+    completed = False
+    trace = RunTrace(tracer or get_tracer(), user_prompt)
+    run = None
+    status = 'cancelled'
+    # aclosing on every nested generator means closing main_stream (ex: the client disconnected) unwinds the whole
+    # chain right away, exiting node.stream/agent.iter and closing the upstream model response
+    try:
+        async with agent.iter(user_prompt) as run:
+            async for node in run:
+                if Agent.is_user_prompt_node(node):
+                    trace.node('UserPromptNode', usage=run.usage())
+                    debug_messages.append(f'UserPromptNode: {node.user_prompt}')
+                elif Agent.is_model_request_node(node):
+                    trace.node('ModelRequestNode', usage=run.usage())
+                    debug_messages.append(f'ModelRequestNode: streaming partial request tokens')
+                    async with node.stream(run.ctx) as request_stream:
+                        async with aclosing(handle_stream_events(request_stream, debug_messages, trace)) as events:
+                            async for content in events:
+                                if content:
+                                    content_streamed = True
+                                    trace.first_token()
+                                    yield content
+                elif Agent.is_call_tools_node(node):
+                    trace.node('CallToolsNode', usage=run.usage())
+                    debug_messages.append(f'ToolCallNode: streaming tool calls and results (debug only)')
+                    async with node.stream(run.ctx) as tool_request_stream:
+                        async with aclosing(handle_stream_events(tool_request_stream, debug_messages, trace)) as events:
+                            async for _ in events:
+                                pass
+                elif Agent.is_end_node(node):
+                    trace.node('End', usage=run.usage())
+                    if content_streamed:
+                        debug_messages.append(f'end_node: {run.result.data}')
+                    else:
+                        trace.first_token()
+                        yield run.result.data
                 else:
-                    yield run.result.data
-            else:
-                debug_messages.append(f'Unknown Node: {type(node)}: {node}')
-                    
-        print('\n\n\nDebug:')
-        print('\n'.join(debug_messages))
-        
+                    trace.node(type(node).__name__, usage=run.usage())
+                    debug_messages.append(f'Unknown Node: {type(node)}: {node}')
+        completed = True
+        status = None
+    except Exception as e:
+        status = type(e).__name__
+        raise
+    finally:
+        trace.finish(usage=run.usage() if run is not None else None, status=status)
+        if debug:
+            if not completed:
+                debug_messages.append('Stream closed before completion, upstream cancelled')
+            print('\n\n\nDebug:')
+            print('\n'.join(map(str, debug_messages)))
@@ -0,0 +1,296 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import AsyncGenerator
+
+
+def make_request_key(**request) -> str:
+    """Canonical hash of an API request, so the same model/system/messages/settings always map to the same key.
+
+    Args:
+        **request: Request fields (ex: model, system, messages, temperature, max_tokens).
+
+    Returns:
+        str: sha256 hex digest of the request serialized with sorted keys.
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class StreamBroadcast:
+    """One upstream stream shared by every concurrent identical streaming call. Chunks are kept so late subscribers
+    start from the beginning.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk: str = None, done: bool = False, error: BaseException = None):
+        async with self._changed:
+            if chunk is not None:
+                self.chunks.append(chunk)
+            self.done = self.done or done
+            self.error = self.error or error
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: position < len(self.chunks) or self.done)
+                    new_chunks = self.chunks[position:]
+                    done, error = self.done, self.error
+                position += len(new_chunks)
+                for chunk in new_chunks:
+                    yield chunk
+                if done and position >= len(self.chunks):
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            self.subscribers -= 1
+            # Stop paying for the upstream stream once nobody is listening
+            if self.subscribers == 0 and self.task is not None and not self.task.done():
+                self.task.cancel()
+
+
+class ResponseCache:
+    """Cache for deterministic LLM requests with an in-memory LRU tier, an optional sqlite on-disk tier that survives
+    restarts, per entry TTL and in-flight deduplication (concurrent identical calls share one upstream request).
+
+    Cached streaming responses are replayed as a stream of chunks. The async paths (get_or_load, stream) run the
+    sqlite tier in a worker thread so it doesn't block the event loop.
+    """
+
+    def __init__(self, max_entries: int = 1000, default_ttl: float = 3600, path: str = None, replay_chunk_size: int = 32):
+        """
+        Args:
+            max_entries (optional, int): In-memory LRU size. Defaults to 1000.
+            default_ttl (optional, float): TTL in seconds when a caller doesn't pass one. Defaults to 3600.
+            path (optional, str): sqlite file for the on-disk tier. Defaults to None (memory only).
+            replay_chunk_size (optional, int): Characters per chunk when replaying a cached stream. Defaults to 32.
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.replay_chunk_size = replay_chunk_size
+        self._memory = OrderedDict()  # key: (response, expires_at)
+        self._in_flight = {}  # key: asyncio.Task
+        self._streams = {}  # key: StreamBroadcast
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_pid = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    @property
+    def disk(self) -> sqlite3.Connection | None:
+        """Connection to the on-disk tier, opened on first use in each process so forked workers (ex: gunicorn
+        --preload) never share the parent's connection. None when the cache is memory only.
+        """
+        if not self.path:
+            return None
+        if self._disk is None or self._disk_pid != os.getpid():
+            self._disk = sqlite3.connect(self.path, check_same_thread=False)
+            self._disk.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, expires_at REAL)')
+            self._disk.commit()
+            self._disk_pid = os.getpid()
+        return self._disk
+
+    def get(self, key: str) -> str | None:
+        """Get a cached response from memory, then disk, returning None on miss or expiry.
+        """
+        now = time.time()
+        response = self._get_memory(key, now)
+        if response is None and self.path:
+            response = self._get_disk(key, now)
+        return response
+
+    async def get_async(self, key: str) -> str | None:
+        """Same as get, with the disk lookup in a worker thread.
+        """
+        now = time.time()
+        response = self._get_memory(key, now)
+        if response is None and self.path:
+            response = await asyncio.to_thread(self._get_disk, key, now)
+        return response
+
+    def set(self, key: str, response: str, ttl: float = None):
+        """Store a response in both tiers.
+        """
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._remember(key, response, expires_at)
+        if self.path:
+            self._set_disk(key, response, expires_at)
+
+    async def set_async(self, key: str, response: str, ttl: float = None):
+        """Same as set, with the disk write in a worker thread.
+        """
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._remember(key, response, expires_at)
+        if self.path:
+            await asyncio.to_thread(self._set_disk, key, response, expires_at)
+
+    def _get_memory(self, key: str, now: float) -> str | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._memory[key]
+        return None
+
+    def _get_disk(self, key: str, now: float) -> str | None:
+        with self._lock:
+            row = self.disk.execute('SELECT response, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            response, expires_at = row
+            if expires_at <= now:
+                self.disk.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.disk.commit()
+                return None
+            self.disk_hits += 1
+        self._remember(key, response, expires_at)
+        return response
+
+    def _set_disk(self, key: str, response: str, expires_at: float):
+        with self._lock:
+            self.disk.execute('INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)', (key, response, expires_at))
+            self.disk.commit()
+
+    def _remember(self, key: str, response: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    async def get_or_load(self, key: str, loader, ttl: float = None, bypass: bool = False) -> str:
+        """Return the cached response for key, or run loader once no matter how many callers are waiting on it.
+
+        Args:
+            key (str): Request key, see make_request_key.
+            loader: Zero argument coroutine function making the upstream call.
+            ttl (optional, float): TTL in seconds. Defaults to default_ttl.
+            bypass (optional, bool): Skip the lookup and always call upstream, refreshing the cached entry. Defaults to False.
+
+        Returns:
+            str: The cached or fresh response.
+        """
+        if bypass:
+            self.bypassed += 1
+            response = await loader()
+            await self.set_async(key, response, ttl=ttl)
+            return response
+
+        response = await self.get_async(key)
+        if response is not None:
+            return response
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, ttl))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # Shield so one cancelled caller doesn't cancel the upstream call for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader, ttl: float) -> str:
+        response = await loader()
+        await self.set_async(key, response, ttl=ttl)
+        return response
+
+    async def replay(self, response: str) -> AsyncGenerator[str, None]:
+        """Replay a cached response as a stream of chunks.
+        """
+        for start in range(0, len(response), self.replay_chunk_size):
+            yield response[start:start + self.replay_chunk_size]
+            await asyncio.sleep(0)
+
+    async def stream(self, key: str, stream_factory, ttl: float = None, bypass: bool = False) -> AsyncGenerator[str, None]:
+        """Streaming version of get_or_load. A cached response is replayed, concurrent identical calls subscribe to
+        the same upstream stream, and the full text is cached only once the upstream stream completes.
+
+        Args:
+            key (str): Request key, see make_request_key.
+            stream_factory: Zero argument function returning an async iterator of text chunks from upstream.
+            ttl (optional, float): TTL in seconds. Defaults to default_ttl.
+            bypass (optional, bool): Skip the lookup and always stream from upstream, refreshing the cached entry. Defaults to False.
+
+        Yields:
+            AsyncGenerator[str, None]: Text chunks.
+        """
+        if bypass:
+            self.bypassed += 1
+        else:
+            response = await self.get_async(key)
+            if response is not None:
+                async for chunk in self.replay(response):
+                    yield chunk
+                return
+
+        broadcast = None if bypass else self._streams.get(key)
+        if broadcast is None:
+            self.misses += 1
+            broadcast = StreamBroadcast()
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, stream_factory, ttl))
+            if not bypass:
+                self._streams[key] = broadcast
+                broadcast.task.add_done_callback(lambda _: self._streams.pop(key, None) if self._streams.get(key) is broadcast else None)
+        else:
+            self.coalesced += 1
+
+        async for chunk in broadcast.subscribe():
+            yield chunk
+
+    async def _pump(self, key: str, broadcast: StreamBroadcast, stream_factory, ttl: float):
+        try:
+            async for chunk in stream_factory():
+                await broadcast.publish(chunk)
+        except asyncio.CancelledError:
+            await broadcast.publish(done=True, error=asyncio.CancelledError())
+            raise
+        except Exception as e:
+            await broadcast.publish(done=True, error=e)
+            return
+        await self.set_async(key, ''.join(broadcast.chunks), ttl=ttl)
+        await broadcast.publish(done=True)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size.
+        """
+        return {
+            'entries': len(self._memory),
+            'in_flight': len(self._in_flight) + len(self._streams),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'bypassed': self.bypassed
+        }
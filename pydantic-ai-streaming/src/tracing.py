@@ -0,0 +1,210 @@
+import os
+import json
+import time
+from collections import deque
+
+
+def new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class Span:
+    """One timed operation. Durations come from the monotonic clock, wall clock time is only used to place the span.
+    """
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_unix_ns', 'start_ns', 'end_ns', 'attributes', 'events', 'status')
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id(8)
+        self.parent_id = parent_id
+        self.start_unix_ns = time.time_ns()
+        self.start_ns = time.monotonic_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.events = []  # (name, monotonic ns, attributes)
+        self.status = 'ok'
+
+    def add_event(self, name: str, **attributes):
+        self.events.append((name, time.monotonic_ns(), attributes))
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.monotonic_ns()) - self.start_ns) / 1e6
+
+    def to_json(self) -> dict:
+        """Flat JSON lines record.
+        """
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time': self.start_unix_ns / 1e9,
+            'duration_ms': round(self.duration_ms, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+            'events': [
+                {'name': name, 'offset_ms': round((at_ns - self.start_ns) / 1e6, 3), 'attributes': attributes}
+                for name, at_ns, attributes in self.events
+            ]
+        }
+
+    def to_otel(self) -> dict:
+        """Record in the OpenTelemetry (OTLP JSON) span layout.
+        """
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'startTimeUnixNano': str(self.start_unix_ns),
+            'endTimeUnixNano': str(self.start_unix_ns + ((self.end_ns or time.monotonic_ns()) - self.start_ns)),
+            'attributes': otel_attributes(self.attributes),
+            'events': [
+                {'name': name, 'timeUnixNano': str(self.start_unix_ns + at_ns - self.start_ns), 'attributes': otel_attributes(attributes)}
+                for name, at_ns, attributes in self.events
+            ],
+            'status': {'code': 'STATUS_CODE_OK' if self.status == 'ok' else 'STATUS_CODE_ERROR', 'message': '' if self.status == 'ok' else self.status}
+        }
+
+
+def otel_attributes(attributes: dict) -> list[dict]:
+    typed = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed_value = {'boolValue': value}
+        elif isinstance(value, int):
+            typed_value = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed_value = {'doubleValue': value}
+        else:
+            typed_value = {'stringValue': str(value)}
+        typed.append({'key': key, 'value': typed_value})
+    return typed
+
+
+class Tracer:
+    """Records finished spans to a local file (JSON lines, one span per line) and keeps the most recent in memory.
+    """
+
+    def __init__(self, path: str = None, export_format: str = 'jsonl', max_recent_spans: int = 1000):
+        """
+        Args:
+            path (optional, str): File to append finished spans to. Defaults to None (memory only).
+            export_format (optional, str): jsonl (flat records) or otel (OTLP JSON span layout). Defaults to jsonl.
+            max_recent_spans (optional, int): Finished spans kept in recent_spans. Defaults to 1000.
+        """
+        if export_format not in ('jsonl', 'otel'):
+            raise ValueError(f'Unsupported trace export format {export_format}')
+        self.path = path
+        self.export_format = export_format
+        self.recent_spans = deque(maxlen=max_recent_spans)
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def start_span(self, name: str, parent: Span = None, **attributes) -> Span:
+        trace_id = parent.trace_id if parent is not None else new_id(16)
+        return Span(name, trace_id, parent.span_id if parent is not None else None, attributes)
+
+    def end_span(self, span: Span, status: str = None):
+        if span.end_ns is not None:
+            return
+        span.end_ns = time.monotonic_ns()
+        if status is not None:
+            span.status = status
+        self.recent_spans.append(span)
+        if self.path:
+            record = span.to_otel() if self.export_format == 'otel' else span.to_json()
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+
+tracer = None
+
+
+def get_tracer() -> Tracer:
+    """Shared tracer, created on first use from TRACE_PATH and TRACE_FORMAT (so a .env loaded after import applies).
+    """
+    global tracer
+    if tracer is None:
+        tracer = Tracer(path=os.getenv('TRACE_PATH'), export_format=os.getenv('TRACE_FORMAT', 'jsonl'))
+    return tracer
+
+
+def usage_attributes(usage) -> dict:
+    """Token counts from a pydantic-ai Usage object (request/response or input/output naming).
+    """
+    attributes = {}
+    for name, fields in (('input_tokens', ('input_tokens', 'request_tokens')), ('output_tokens', ('output_tokens', 'response_tokens'))):
+        for field in fields:
+            value = getattr(usage, field, None)
+            if value is not None:
+                attributes[name] = value
+                break
+    requests = getattr(usage, 'requests', None)
+    if requests is not None:
+        attributes['requests'] = requests
+    return attributes
+
+
+class RunTrace:
+    """Spans for one agent run: a root agent_run span, one span per graph node and one per tool call, with time to
+    first token and token counts.
+    """
+
+    def __init__(self, tracer: Tracer, user_prompt: str, **attributes):
+        self.tracer = tracer
+        self.root = tracer.start_span('agent_run', prompt_chars=len(user_prompt), **attributes)
+        self.node_span = None
+        self.node_usage = None
+        self.tool_spans = {}  # tool_call_id: Span
+        self.first_token_ns = None
+
+    def node(self, node_name: str, usage=None):
+        """A new graph node arrived, which also means the previous one has finished.
+
+        Args:
+            node_name (str): Span name (ex: ModelRequestNode).
+            usage (optional): run.usage() snapshot, so each node span gets the tokens used while it ran.
+        """
+        self.end_node(usage=usage)
+        self.node_span = self.tracer.start_span(node_name, parent=self.root)
+        # run.usage() is updated in place, so keep a copy of the counts
+        self.node_usage = usage_attributes(usage) if usage is not None else None
+
+    def end_node(self, usage=None, status: str = None):
+        if self.node_span is None:
+            return
+        if usage is not None and self.node_usage is not None:
+            for name, value in usage_attributes(usage).items():
+                self.node_span.attributes[name] = value - self.node_usage.get(name, 0)
+        self.tracer.end_span(self.node_span, status=status)
+        self.node_span = None
+
+    def first_token(self):
+        if self.first_token_ns is None:
+            self.first_token_ns = time.monotonic_ns()
+            self.root.attributes['time_to_first_token_ms'] = round((self.first_token_ns - self.root.start_ns) / 1e6, 3)
+            self.root.add_event('first_token')
+
+    def tool_call_started(self, tool_name: str, tool_call_id: str):
+        self.tool_spans[tool_call_id] = self.tracer.start_span(
+            f'tool_call {tool_name}', parent=self.node_span or self.root, tool_name=tool_name, tool_call_id=tool_call_id
+        )
+
+    def tool_call_finished(self, tool_call_id: str):
+        span = self.tool_spans.pop(tool_call_id, None)
+        if span is not None:
+            self.tracer.end_span(span)
+
+    def finish(self, usage=None, status: str = None):
+        """End every open span. status is None for a completed run, or a reason (ex: cancelled, an exception name).
+        """
+        for span in list(self.tool_spans.values()):
+            self.tracer.end_span(span, status=status or 'unfinished')
+        self.tool_spans.clear()
+        self.end_node(usage=usage, status=status)
+        if usage is not None:
+            self.root.attributes.update(usage_attributes(usage))
+        self.tracer.end_span(self.root, status=status)
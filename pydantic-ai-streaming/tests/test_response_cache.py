@@ -0,0 +1,139 @@
+import os
+import asyncio
+import pytest
+from src.response_cache import ResponseCache, make_request_key
+
+
+class FakeUpstream:
+    """Counts upstream calls. Streams yield chunks with a pause between them, so concurrent callers overlap.
+    """
+
+    def __init__(self, chunks: list[str], fail_after: int = None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = 0
+        self.cancelled = False
+
+    async def load(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return ''.join(self.chunks)
+
+    async def stream(self):
+        self.calls += 1
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i == self.fail_after:
+                    raise RuntimeError('upstream failed')
+                await asyncio.sleep(0.01)
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def collect(stream) -> str:
+    return ''.join([chunk async for chunk in stream])
+
+
+def test_request_key_ignores_field_order():
+    assert make_request_key(model='m', max_tokens=10) == make_request_key(max_tokens=10, model='m')
+    assert make_request_key(model='m', max_tokens=10) != make_request_key(model='m', max_tokens=11)
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    cache = ResponseCache()
+    upstream = FakeUpstream(['hello ', 'world'])
+
+    async def run():
+        results = await asyncio.gather(*[cache.get_or_load('key', upstream.load) for _ in range(5)])
+        return results, await cache.get_or_load('key', upstream.load)
+
+    results, cached = asyncio.run(run())
+    assert results == ['hello world'] * 5
+    assert cached == 'hello world'
+    assert upstream.calls == 1
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    cache = ResponseCache()
+    upstream = FakeUpstream(['ok'])
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_load('key', upstream.load))
+        second = asyncio.ensure_future(cache.get_or_load('key', upstream.load))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 'ok'
+    assert upstream.calls == 1
+
+
+def test_concurrent_streams_share_one_upstream_and_completed_streams_are_replayed():
+    cache = ResponseCache(replay_chunk_size=4)
+    upstream = FakeUpstream(['one ', 'two ', 'three'])
+
+    async def run():
+        first = asyncio.ensure_future(collect(cache.stream('key', upstream.stream)))
+        await asyncio.sleep(0.025)
+        # Joins mid stream and still gets every chunk from the start
+        late = await collect(cache.stream('key', upstream.stream))
+        return await first, late, await collect(cache.stream('key', upstream.stream))
+
+    first, late, replayed = asyncio.run(run())
+    assert first == late == replayed == 'one two three'
+    assert upstream.calls == 1
+
+
+def test_failed_stream_reaches_every_subscriber_and_is_not_cached():
+    cache = ResponseCache()
+    upstream = FakeUpstream(['one ', 'two ', 'three'], fail_after=2)
+
+    async def run():
+        results = await asyncio.gather(*[collect(cache.stream('key', upstream.stream)) for _ in range(3)], return_exceptions=True)
+        return results, cache.get('key')
+
+    results, cached = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cached is None
+
+
+def test_upstream_stream_is_cancelled_once_every_subscriber_leaves():
+    cache = ResponseCache()
+    upstream = FakeUpstream([f'{i} ' for i in range(100)])
+
+    async def run():
+        stream = cache.stream('key', upstream.stream)
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.02)
+
+    asyncio.run(run())
+    assert upstream.cancelled
+    assert cache.get('key') is None
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    upstream = FakeUpstream(['cached'])
+    asyncio.run(ResponseCache(path=path).get_or_load('key', upstream.load))
+
+    restarted = ResponseCache(path=path)
+    assert asyncio.run(restarted.get_or_load('key', upstream.load)) == 'cached'
+    assert upstream.calls == 1
+    assert restarted.stats()['disk_hits'] == 1
+
+
+def test_disk_connection_is_reopened_in_a_forked_process(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / 'responses.sqlite'))
+    cache.set('key', 'value')
+    parent_connection = cache.disk
+
+    # What a forked gunicorn worker sees: same object, different pid
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert cache.disk is not parent_connection
+    assert cache._get_disk('key', 0) == 'value'
@@ -1,10 +1,13 @@
 from mcp.server.fastmcp import FastMCP
+from src.build_mcp.tool_registry import ToolRegistry
 
 # Create an MCP server
 mcp = FastMCP("Demo")
+tools = ToolRegistry(mcp)
 
 
-@mcp.tool()
+# Lookup tool agents call repeatedly: serve repeats from cache and cap concurrent backend lookups
+@tools.tool(cache_ttl=300, max_concurrency=10, timeout=5)
 async def get_user_name() -> str:
     """
     This function is used to retrieve the user name.
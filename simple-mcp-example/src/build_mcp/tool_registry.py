@@ -0,0 +1,172 @@
+import copy
+import json
+import time
+import asyncio
+import inspect
+import functools
+from collections import OrderedDict
+from mcp.server.fastmcp import FastMCP, Context
+
+
+class ToolPolicy:
+    """Execution settings for one registered tool.
+    """
+
+    def __init__(self, cache_ttl: float = None, idempotent: bool = False, cache_key_args: list[str] = None, max_concurrency: int = None, timeout: float = None):
+        self.cache_ttl = cache_ttl
+        # Cached results are reused, so a cacheable tool is idempotent by definition
+        self.idempotent = idempotent or cache_ttl is not None
+        self.cache_key_args = cache_key_args
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.semaphore = None
+        self.calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+
+class ToolRegistry:
+    """Registers tools on a FastMCP server with optional result caching, in-flight deduplication, per tool
+    concurrency limits and timeouts.
+
+    Tools run concurrently: async tools on the event loop and sync tools in worker threads, so a slow sync tool
+    doesn't block other call_tool requests. A thread can't be cancelled, so a sync tool that times out keeps running
+    in the background and holds its max_concurrency slot until it returns.
+
+    Cached and shared (coalesced) results are deep copied for every caller, so one caller changing its result can't
+    change what the others or later cache hits get.
+    """
+
+    def __init__(self, mcp: FastMCP, max_cache_entries: int = 1000):
+        """
+        Args:
+            mcp (FastMCP): Server to register tools on.
+            max_cache_entries (optional, int): LRU size shared by all cacheable tools. Defaults to 1000.
+        """
+        self.mcp = mcp
+        self.max_cache_entries = max_cache_entries
+        self.policies = {}  # tool name: ToolPolicy
+        self._cache = OrderedDict()  # (tool name, arguments json): (result, expires_at)
+        self._in_flight = {}  # key: asyncio.Task
+
+    def tool(
+        self,
+        name: str = None,
+        description: str = None,
+        cache_ttl: float = None,
+        idempotent: bool = False,
+        cache_key_args: list[str] = None,
+        max_concurrency: int = None,
+        timeout: float = None
+    ):
+        """Decorator registering a tool, ex: @tools.tool(cache_ttl=300, max_concurrency=10, timeout=5).
+
+        Args:
+            name (optional, str): Tool name. Defaults to the function name.
+            description (optional, str): Tool description. Defaults to the docstring.
+            cache_ttl (optional, float): Seconds to serve repeated calls with the same arguments from cache. Defaults to None (no caching).
+            idempotent (optional, bool): Concurrent calls with the same arguments share one execution. Implied by cache_ttl. Defaults to False.
+            cache_key_args (optional, list[str]): Arguments that make up the cache key. Defaults to None (all arguments).
+            max_concurrency (optional, int): Max executions of this tool at once. Defaults to None (unlimited).
+            timeout (optional, float): Seconds an execution may take before the call fails. Defaults to None (no timeout).
+        """
+        def decorator(fn):
+            tool_name = name or fn.__name__
+            policy = self.policies[tool_name] = ToolPolicy(cache_ttl, idempotent, cache_key_args, max_concurrency, timeout)
+            signature = inspect.signature(fn)
+
+            # wraps keeps the signature and docstring, which FastMCP uses to build the tool's input schema
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                arguments = signature.bind(*args, **kwargs).arguments
+                return await self.call(tool_name, policy, functools.partial(fn, *args, **kwargs), arguments)
+
+            self.mcp.add_tool(wrapper, name=tool_name, description=description)
+            return wrapper
+        return decorator
+
+    def make_key(self, tool_name: str, policy: ToolPolicy, arguments: dict) -> tuple[str, str]:
+        # The request Context FastMCP injects isn't part of a tool's arguments
+        key_arguments = {
+            argument: value for argument, value in arguments.items()
+            if (policy.cache_key_args is None or argument in policy.cache_key_args) and not isinstance(value, Context)
+        }
+        return tool_name, json.dumps(key_arguments, sort_keys=True, default=repr)
+
+    async def call(self, tool_name: str, policy: ToolPolicy, bound_fn, arguments: dict):
+        policy.calls += 1
+        if not policy.idempotent:
+            return await self._execute(tool_name, policy, bound_fn)
+
+        key = self.make_key(tool_name, policy, arguments)
+        if policy.cache_ttl is not None:
+            entry = self._cache.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._cache.move_to_end(key)
+                policy.cache_hits += 1
+                return copy.deepcopy(entry[0])
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute(tool_name, policy, bound_fn, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            policy.coalesced += 1
+        # Shield so one cancelled request doesn't cancel the execution other callers are waiting on
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _execute(self, tool_name: str, policy: ToolPolicy, bound_fn, key: tuple[str, str] = None):
+        if policy.max_concurrency is not None and policy.semaphore is None:
+            policy.semaphore = asyncio.Semaphore(policy.max_concurrency)
+
+        semaphore = policy.semaphore
+        if semaphore is not None:
+            await semaphore.acquire()
+        is_async = inspect.iscoroutinefunction(bound_fn.func)
+        execution = asyncio.ensure_future(bound_fn() if is_async else asyncio.to_thread(bound_fn))
+
+        def finished(done: asyncio.Future):
+            # Free the slot only once the tool has really stopped, and retrieve the error of a timed out sync tool
+            if semaphore is not None:
+                semaphore.release()
+            if not done.cancelled():
+                done.exception()
+        execution.add_done_callback(finished)
+
+        # wait_for cancels an async tool on timeout, a sync tool's thread is shielded and runs on
+        result = await self._run_with_timeout(tool_name, policy, execution if is_async else asyncio.shield(execution))
+
+        if key is not None and policy.cache_ttl is not None:
+            self._cache[key] = (result, time.monotonic() + policy.cache_ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    async def _run_with_timeout(tool_name: str, policy: ToolPolicy, execution):
+        try:
+            return await asyncio.wait_for(execution, policy.timeout)
+        except asyncio.TimeoutError:
+            policy.timeouts += 1
+            raise TimeoutError(f'Tool {tool_name} timed out after {policy.timeout}s')
+
+    def invalidate(self, tool_name: str = None):
+        """Drop cached results for one tool, or for every tool.
+        """
+        for key in [key for key in self._cache if tool_name is None or key[0] == tool_name]:
+            del self._cache[key]
+
+    def stats(self) -> dict:
+        return {
+            tool_name: {
+                'calls': policy.calls,
+                'cache_hits': policy.cache_hits,
+                'coalesced': policy.coalesced,
+                'timeouts': policy.timeouts
+            }
+            for tool_name, policy in self.policies.items()
+        }
+